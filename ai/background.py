@@ -0,0 +1,73 @@
+import queue
+import threading
+from ai.minimax import find_best_move
+from ai.stats import SearchStats
+
+# find_best_move in a background thread, so a GUI can keep handling events
+# while the engine thinks. Results come back through a queue; progress can
+# be read from the live SearchStats at any time.
+
+
+class BackgroundSearch:
+
+    # search_options are passed on to find_best_move (max_time, max_depth, book, ...)
+    def __init__(self, **search_options):
+        self.search_options = search_options
+        self.results = queue.Queue()  # (search id, move, stats)
+        self.thread = None
+        self.stop_event = None
+        self.stats = None
+        self.search_id = 0
+
+    # A search was started and its result hasn't been collected by poll()
+    def running(self):
+        return self.thread is not None
+
+    # Start searching a copy of `board` (the caller keeps using its own).
+    # Keyword arguments override the search options for this search only.
+    def start(self, board, **options):
+        self.cancel()
+        self.search_id += 1
+        search_id = self.search_id
+        self.stop_event = threading.Event()
+        self.stats = SearchStats()
+        options = {**self.search_options, **options}
+        self.thread = threading.Thread(target=self.run, daemon=True,
+                                       args=(board.copy(), search_id, self.stop_event, self.stats, options))
+        self.thread.start()
+
+    def run(self, board, search_id, stop_event, stats, options):
+        move = find_best_move(board, stats=stats, stop=stop_event, **options)
+        self.results.put((search_id, move, stats))
+
+    # Play now: the search ends with the best move found so far
+    def force(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    # Drop the current search, its result is never returned by poll()
+    def cancel(self):
+        self.search_id += 1
+        if self.stop_event is not None:
+            self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    # (move, stats) once the current search is done, otherwise None.
+    # The move is None if the search was forced before any iteration finished.
+    def poll(self):
+        while True:
+            try:
+                search_id, move, stats = self.results.get_nowait()
+            except queue.Empty:
+                return None
+            if search_id == self.search_id:
+                self.thread = None
+                return move, stats
+
+    # Live numbers of the running search: (depth, best move so far, nodes)
+    def progress(self):
+        if self.stats is None:
+            return 0, None, 0
+        return self.stats.depth, self.stats.best_move, self.stats.nodes
@@ -0,0 +1,156 @@
+import chess as ch
+import numpy as np
+from ai.incremental import material_table, piecepos_table, center_table
+from ai.pawn_hash import PASSED_MASKS, CHAIN_MASKS
+from ai.evaluation import (forced_score, initiative_bonus, evaluate_mobility, evaluate_check,
+                           evaluate_mobility_fast, evaluate_check_fast, PAWN_STRUCTURE_WEIGHT,
+                           MOBILITY_WEIGHT, KING_WEIGHT, CHECK_WEIGHT)
+from ai.bitboard_eval import evaluate_king_bb
+
+# Vectorized evaluate() for scoring many positions at once (tuning, analysis).
+# Needs numpy, which the engine itself doesn't.
+#
+# Positions are encoded as (N, 12, 64) 0/1 planes: white pawn..king, then
+# black pawn..king, square index as in python-chess. Material, piece-square,
+# center, bishop pair and pawn structure are array operations over the whole
+# batch; mobility, king safety, check threats and game-over scores still run
+# per position.
+
+PIECE_TYPES = (ch.PAWN, ch.KNIGHT, ch.BISHOP, ch.ROOK, ch.QUEEN, ch.KING)
+WHITE_PAWNS = 0
+WHITE_BISHOPS = 2
+BLACK_PAWNS = 6
+BLACK_BISHOPS = 8
+
+
+def plane_index(color, piece_type):
+    return (0 if color == ch.WHITE else 6) + piece_type - 1
+
+
+# Material + piece-square + center value of a piece on a square, per plane
+def _square_weights():
+    weights = np.zeros((12, 64))
+    for color in (ch.WHITE, ch.BLACK):
+        for piece_type in PIECE_TYPES:
+            for cell in ch.SQUARES:
+                weights[plane_index(color, piece_type), cell] = (
+                    material_table[color][piece_type][cell]
+                    + piecepos_table[color][piece_type][cell]
+                    + center_table[color][cell])
+    return weights.reshape(768)
+
+SQUARE_WEIGHTS = _square_weights()
+
+
+# masks[p] as a 0/1 matrix M with M[s, p] = 1 for every square s in the mask
+def _mask_matrix(masks):
+    matrix = np.zeros((64, 64))
+    for pawn, mask in enumerate(masks):
+        for square in ch.scan_forward(mask):
+            matrix[square, pawn] = 1
+    return matrix
+
+PASSED_MATRIX = {color: _mask_matrix(PASSED_MASKS[color]) for color in (ch.WHITE, ch.BLACK)}
+CHAIN_MATRIX = {color: _mask_matrix(CHAIN_MASKS[color]) for color in (ch.WHITE, ch.BLACK)}
+
+# Value of a passed pawn per square (1 + advance bonus * 0.1)
+PASSED_VALUE = {
+    ch.WHITE: np.array([1 + (7 - cell // 8) * 0.1 for cell in ch.SQUARES]),
+    ch.BLACK: np.array([1 + (cell // 8) * 0.1 for cell in ch.SQUARES]),
+}
+
+
+# (N, 12, 64) uint8 planes of the boards
+def encode_boards(boards):
+    bitboards = np.zeros((len(boards), 12), dtype="<u8")
+    for i, board in enumerate(boards):
+        for color in (ch.WHITE, ch.BLACK):
+            own = board.occupied_co[color]
+            for piece_type in PIECE_TYPES:
+                bitboards[i, plane_index(color, piece_type)] = board.pieces_mask(piece_type, color) & own
+    bits = np.unpackbits(bitboards.view(np.uint8).reshape(len(boards), 12, 8), axis=-1, bitorder="little")
+    return bits.reshape(len(boards), 12, 64)
+
+
+def pawn_structure_batch(planes):
+    white = planes[:, WHITE_PAWNS].astype(np.float64)
+    black = planes[:, BLACK_PAWNS].astype(np.float64)
+
+    score = np.zeros(len(planes))
+    score += doubled_batch(white) * 0.5
+    score -= doubled_batch(black) * 0.5
+    score += isolated_batch(white) * 0.3
+    score -= isolated_batch(black) * 0.3
+    score -= passed_batch(white, black, ch.WHITE) * 0.6
+    score += passed_batch(black, white, ch.BLACK) * 0.6
+    score -= chains_batch(white, ch.WHITE) * 0.4
+    score += chains_batch(black, ch.BLACK) * 0.4
+    return score
+
+
+# Pawns per file, (N, 8)
+def file_counts(pawns):
+    return pawns.reshape(-1, 8, 8).sum(axis=1)
+
+
+def doubled_batch(pawns):
+    return np.maximum(file_counts(pawns) - 1, 0).sum(axis=1)
+
+
+def isolated_batch(pawns):
+    counts = file_counts(pawns)
+    occupied = counts > 0
+    neighbours = np.zeros_like(occupied)
+    neighbours[:, 1:] |= occupied[:, :-1]
+    neighbours[:, :-1] |= occupied[:, 1:]
+    return (counts * ~neighbours).sum(axis=1)
+
+
+def passed_batch(pawns, enemy_pawns, color):
+    blockers = enemy_pawns @ PASSED_MATRIX[color]
+    return (pawns * (blockers == 0)) @ PASSED_VALUE[color]
+
+
+def chains_batch(pawns, color):
+    protectors = pawns @ CHAIN_MATRIX[color]
+    return (pawns * protectors).sum(axis=1)
+
+
+# Material, piece-square, center, bishop pair and pawn structure of every
+# position, as evaluate() adds them up
+def static_terms_batch(planes):
+    planes = np.asarray(planes)
+    score = planes.reshape(len(planes), 768) @ SQUARE_WEIGHTS
+
+    white_bishops = planes[:, WHITE_BISHOPS].sum(axis=1)
+    black_bishops = planes[:, BLACK_BISHOPS].sum(axis=1)
+    score -= (white_bishops >= 2) * 0.3
+    score += (black_bishops >= 2) * 0.3
+
+    score += pawn_structure_batch(planes) * PAWN_STRUCTURE_WEIGHT
+    return score
+
+
+# evaluate() (or evaluate_fast() with fast=True) of every board as an array.
+# Matches the scalar functions up to float rounding.
+def evaluate_batch(boards, fast=False):
+    boards = list(boards)
+    if not boards:
+        return np.zeros(0)
+    scores = static_terms_batch(encode_boards(boards))
+
+    for i, board in enumerate(boards):
+        if not fast:
+            forced = forced_score(board)
+            if forced is not None:
+                scores[i] = forced
+                continue
+            scores[i] += evaluate_mobility(board) * MOBILITY_WEIGHT
+            scores[i] += evaluate_check(board) * CHECK_WEIGHT
+        else:
+            scores[i] += evaluate_mobility_fast(board) * MOBILITY_WEIGHT
+            scores[i] += evaluate_check_fast(board) * CHECK_WEIGHT
+        scores[i] += evaluate_king_bb(board) * KING_WEIGHT
+        scores[i] += initiative_bonus(board.turn)
+
+    return scores
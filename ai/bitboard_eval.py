@@ -0,0 +1,174 @@
+import chess as ch
+from ai.evaluation import (material_values, center_cells, forced_score, weighted_score,
+                           evaluate_pawn_structure, evaluate_mobility, evaluate_check,
+                           evaluate_mobility_fast, evaluate_check_fast)
+from ai.incremental import piecepos_table
+
+# Same scores as evaluate() / evaluate_fast(), with the square by square
+# terms worked out on python-chess's integer bitboards: popcounts over
+# masks precomputed per square instead of board.piece_at() loops.
+# Mobility, check and mate in one terms are the ones from ai/evaluation.py.
+
+PIECE_TYPES = (ch.PAWN, ch.KNIGHT, ch.BISHOP, ch.ROOK, ch.QUEEN, ch.KING)
+
+CENTER_MASK = 0
+for cell in center_cells:
+    CENTER_MASK |= ch.BB_SQUARES[cell]
+
+# File masks of a file and its neighbours (count_open_files_near_king)
+NEAR_FILES = [[ch.BB_FILES[f] for f in range(max(0, king_file - 1), min(8, king_file + 2))]
+              for king_file in range(8)]
+
+# Squares next to the king (count_defending_pieces)
+KING_ZONE = ch.BB_KING_ATTACKS
+
+
+# Pawn shield squares of evaluate_pawn_shield, per color and king square:
+# (squares on the king's file, squares on the files next to it)
+def _shield_masks(color):
+    masks = []
+    for king_square in ch.SQUARES:
+        king_file = king_square % 8
+        king_rank = king_square // 8
+        if color == ch.WHITE:
+            ranks = range(min(8, king_rank + 3))[king_rank + 1:]
+        else:
+            ranks = range(max(0, king_rank - 2), king_rank)
+        front = 0
+        sides = 0
+        for f in range(max(0, king_file - 1), min(8, king_file + 2)):
+            for r in ranks:
+                if f == king_file:
+                    front |= ch.BB_SQUARES[r * 8 + f]
+                else:
+                    sides |= ch.BB_SQUARES[r * 8 + f]
+        masks.append((front, sides))
+    return masks
+
+SHIELD_MASKS = {ch.WHITE: _shield_masks(ch.WHITE), ch.BLACK: _shield_masks(ch.BLACK)}
+
+
+def piece_masks(board):
+    return (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+
+
+def evaluate_material_bb(board):
+    black = board.occupied_co[ch.BLACK]
+    white = board.occupied_co[ch.WHITE]
+    score = 0
+    for piece_type, mask in zip(PIECE_TYPES, piece_masks(board)):
+        score += (ch.popcount(mask & black) - ch.popcount(mask & white)) * material_values[piece_type]
+    return score
+
+
+def evaluate_piecepos_bb(board):
+    score = 0
+    for color in (ch.WHITE, ch.BLACK):
+        own = board.occupied_co[color]
+        tables = piecepos_table[color]
+        for piece_type, mask in zip(PIECE_TYPES, piece_masks(board)):
+            table = tables[piece_type]
+            for cell in ch.scan_forward(mask & own):
+                score += table[cell]
+    return score
+
+
+def evaluate_center_bb(board):
+    black = ch.popcount(board.occupied_co[ch.BLACK] & CENTER_MASK)
+    white = ch.popcount(board.occupied_co[ch.WHITE] & CENTER_MASK)
+    return (black - white) * 0.1
+
+
+def evaluate_bishop_bb(board):
+    score = 0.0
+    if ch.popcount(board.bishops & board.occupied_co[ch.WHITE]) >= 2:
+        score -= 0.3
+    if ch.popcount(board.bishops & board.occupied_co[ch.BLACK]) >= 2:
+        score += 0.3
+    return score
+
+
+def evaluate_king_bb(board):
+    score = 0.0
+
+    w_king_cell = board.king(ch.WHITE)
+    b_king_cell = board.king(ch.BLACK)
+
+    score -= king_safety_bb(board, w_king_cell, ch.WHITE) * 0.2
+    score += king_safety_bb(board, b_king_cell, ch.BLACK) * 0.2
+
+    score += open_files_near_king_bb(board, w_king_cell % 8) * 0.3
+    score -= open_files_near_king_bb(board, b_king_cell % 8) * 0.3
+
+    if board.is_check():
+        if board.turn == ch.WHITE:
+            score += 0.5
+        else:
+            score -= 0.5
+
+    return score
+
+
+def king_safety_bb(board, king_square, color):
+    safety_score = 0
+
+    if board.has_kingside_castling_rights(color):
+        safety_score += 2 * 0.2
+    if board.has_queenside_castling_rights(color):
+        safety_score += 1 * 0.2
+
+    if ch.BB_SQUARES[king_square] & ch.BB_CORNERS:
+        safety_score += 1 * 0.2
+
+    safety_score += pawn_shield_bb(board, king_square, color)
+    safety_score += defending_pieces_bb(board, king_square, color) * 0.1
+
+    return safety_score
+
+
+def pawn_shield_bb(board, king_square, color):
+    pawns = board.pawns & board.occupied_co[color]
+    front, sides = SHIELD_MASKS[color][king_square]
+    return ch.popcount(pawns & front) * 1.5 + ch.popcount(pawns & sides)
+
+
+# Attackers of `color` summed over the squares around the king
+def defending_pieces_bb(board, king_square, color):
+    count = 0
+    for square in ch.scan_forward(KING_ZONE[king_square]):
+        count += ch.popcount(board.attackers_mask(color, square))
+    return count
+
+
+def open_files_near_king_bb(board, king_file):
+    pawns = board.pawns
+    count = 0
+    for mask in NEAR_FILES[king_file]:
+        if not pawns & mask:
+            count += 1
+    return count
+
+
+# Material + piece position + center, from the incremental sums when kept
+def static_terms_bb(board, inc):
+    if inc is not None:
+        return inc.material + inc.piecepos + inc.center
+    return evaluate_material_bb(board) + evaluate_piecepos_bb(board) + evaluate_center_bb(board)
+
+
+# evaluate() on bitboards. Scores match it up to float rounding.
+def evaluate_bitboard(board, inc=None, turn=None):
+    forced = forced_score(board)
+    if forced is not None:
+        return forced
+
+    return weighted_score(static_terms_bb(board, inc), evaluate_bishop_bb(board), evaluate_pawn_structure(board),
+                          evaluate_mobility(board), evaluate_king_bb(board), evaluate_check(board),
+                          board.turn if turn is None else turn)
+
+
+# evaluate_fast() on bitboards
+def evaluate_bitboard_fast(board, inc=None, turn=None):
+    return weighted_score(static_terms_bb(board, inc), evaluate_bishop_bb(board), evaluate_pawn_structure(board),
+                          evaluate_mobility_fast(board), evaluate_king_bb(board), evaluate_check_fast(board),
+                          board.turn if turn is None else turn)
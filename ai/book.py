@@ -0,0 +1,142 @@
+import os
+import glob
+import random
+import struct
+import chess as ch
+import chess.polyglot
+
+# Opening book in the Polyglot format: build one from PGN files and pick
+# weighted random book moves before searching.
+
+# Book moves are only played for the first BOOK_DEPTH plies of a game
+BOOK_DEPTH = 16
+
+# Where gui.py and cmdln.py look for a book
+DEFAULT_BOOK = os.path.join("books", "self_play.bin")
+
+# Weight of a move by the result for the side that played it
+RESULT_WEIGHTS = {"win": 2, "draw": 1, "loss": 0}
+
+PROMOTION_CODES = {ch.KNIGHT: 1, ch.BISHOP: 2, ch.ROOK: 3, ch.QUEEN: 4}
+ENTRY = struct.Struct(">QHHI")  # key, move, weight, learn
+
+
+# Polyglot move encoding. Castling is written as the king taking its own rook.
+def encode_move(board, move):
+    to_square = move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if board.is_kingside_castling(move) else 0
+        to_square = ch.square(rook_file, ch.square_rank(move.from_square))
+    return (ch.square_file(to_square)
+            | ch.square_rank(to_square) << 3
+            | ch.square_file(move.from_square) << 6
+            | ch.square_rank(move.from_square) << 9
+            | PROMOTION_CODES.get(move.promotion, 0) << 12)
+
+
+def result_weight(result, color):
+    if result == "1/2-1/2":
+        return RESULT_WEIGHTS["draw"]
+    if result not in ("1-0", "0-1"):
+        return 0
+    won = (result == "1-0") == (color == ch.WHITE)
+    return RESULT_WEIGHTS["win"] if won else RESULT_WEIGHTS["loss"]
+
+
+# Count the first `depth` plies of every game: {(key, raw move): weight}
+def collect_moves(pgn_paths, depth=BOOK_DEPTH):
+    import chess.pgn  # slow to import (chess.engine, asyncio), only needed here
+    weights = {}
+    games = 0
+    for path in pgn_paths:
+        with open(path) as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                games += 1
+                result = game.headers.get("Result", "*")
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= depth:
+                        break
+                    entry = (chess.polyglot.zobrist_hash(board), encode_move(board, move))
+                    weights[entry] = weights.get(entry, 0) + result_weight(result, board.turn)
+                    board.push(move)
+    return weights, games
+
+
+# Write a Polyglot book from PGN files. Moves that only ever lost are left out.
+# Returns (games read, entries written).
+def build_book(pgn_paths, out_path, depth=BOOK_DEPTH):
+    weights, games = collect_moves(pgn_paths, depth)
+    entries = sorted((key, move, weight) for (key, move), weight in weights.items() if weight > 0)
+
+    # Weights are 16 bit in the file
+    top = max((weight for _, _, weight in entries), default=0)
+    scale = 0xFFFF / top if top > 0xFFFF else 1
+
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(out_path, "wb") as out:
+        for key, move, weight in entries:
+            out.write(ENTRY.pack(key, move, max(1, int(weight * scale)), 0))
+    return games, len(entries)
+
+
+# Polyglot book lookup in front of the search.
+# choose(board) returns a weighted random book move, or None once the game
+# is past `depth` plies or the position isn't in the book.
+class OpeningBook:
+
+    def __init__(self, path=DEFAULT_BOOK, depth=BOOK_DEPTH, seed=None):
+        self.path = path
+        self.depth = depth
+        self.random = random.Random(seed)
+        self.reader = None
+
+    def open(self):
+        if self.reader is None:
+            self.reader = chess.polyglot.open_reader(self.path)
+        return self.reader
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def choose(self, board):
+        if board.ply() >= self.depth:
+            return None
+        try:
+            return self.open().weighted_choice(board, random=self.random).move
+        except IndexError:
+            return None
+
+    def moves(self, board):
+        return [(entry.move, entry.weight) for entry in self.open().find_all(board)]
+
+
+# The default book if it has been built, otherwise None
+def load_default_book(depth=BOOK_DEPTH):
+    if os.path.exists(DEFAULT_BOOK) and os.path.getsize(DEFAULT_BOOK) > 0:
+        return OpeningBook(DEFAULT_BOOK, depth)
+    return None
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Build a Polyglot opening book from PGN files.")
+    parser.add_argument('pgn', nargs='*', default=[os.path.join("self_play_results", "*.pgn")],
+                        help="PGN files or glob patterns (default: the self-play archive)")
+    parser.add_argument('--output', default=DEFAULT_BOOK, help="Book file to write")
+    parser.add_argument('--depth', type=int, default=BOOK_DEPTH, help="Plies of each game to keep")
+    args = parser.parse_args()
+
+    paths = sorted(path for pattern in args.pgn for path in glob.glob(pattern))
+    games, entries = build_book(paths, args.output, args.depth)
+    print(f"{games} games from {len(paths)} files -> {entries} book entries in {args.output}")
+
+if __name__ == "__main__":
+    main()
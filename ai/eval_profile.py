@@ -0,0 +1,140 @@
+import io
+import time
+import pstats
+import cProfile
+import chess as ch
+from ai.utils import can_checkmate_in_one
+from ai.pawn_hash import pawn_structure_score
+from ai.bitboard_eval import (evaluate_material_bb, evaluate_piecepos_bb, evaluate_center_bb,
+                              evaluate_bishop_bb, evaluate_king_bb)
+from ai.evaluation import (evaluate, evaluate_fast, terminal_score, evaluate_material, evaluate_piecepos,
+                           evaluate_center, evaluate_bishop, evaluate_pawn_structure, evaluate_mobility,
+                           evaluate_king, evaluate_check, evaluate_mobility_fast, evaluate_check_fast)
+
+
+# Game-over block at the start of evaluate()
+def terminal_checks(board):
+    return (board.is_checkmate() or board.is_stalemate() or board.is_insufficient_material()
+            or board.is_fifty_moves() or board.is_repetition())
+
+# Mate in one block of evaluate()
+def mate_in_one_checks(board):
+    if not board.is_game_over():
+        return can_checkmate_in_one(board, ch.BLACK) or can_checkmate_in_one(board, ch.WHITE)
+    return False
+
+# evaluate_pawn_structure without the pawn hash
+def pawn_structure_uncached(board):
+    return pawn_structure_score(board.pawns & board.occupied_co[ch.WHITE],
+                                board.pawns & board.occupied_co[ch.BLACK])
+
+
+# Every piece of evaluate(): (name, function)
+EVAL_TERMS = [
+    ("terminal", terminal_checks),
+    ("mate_in_one", mate_in_one_checks),
+    ("material", evaluate_material),
+    ("piecepos", evaluate_piecepos),
+    ("center", evaluate_center),
+    ("bishop", evaluate_bishop),
+    ("pawn_structure", evaluate_pawn_structure),
+    ("mobility", evaluate_mobility),
+    ("king", evaluate_king),
+    ("check", evaluate_check),
+]
+
+# Drop-in replacements for some of the terms above: evaluate_fast, the
+# uncached pawn structure and the bitboard backend (ai/bitboard_eval.py)
+REPLACEMENT_TERMS = [
+    ("terminal_fast", terminal_score),
+    ("mobility_fast", evaluate_mobility_fast),
+    ("check_fast", evaluate_check_fast),
+    ("pawn_uncached", pawn_structure_uncached),
+    ("material_bb", evaluate_material_bb),
+    ("piecepos_bb", evaluate_piecepos_bb),
+    ("center_bb", evaluate_center_bb),
+    ("bishop_bb", evaluate_bishop_bb),
+    ("king_bb", evaluate_king_bb),
+]
+
+
+# Positions to profile on: each start position and every position one move
+# away from it, which is close to what the search sees at its leaves
+def leaf_positions(fens):
+    boards = []
+    for fen in fens:
+        board = ch.Board(fen)
+        boards.append(board.copy())
+        for move in board.legal_moves:
+            board.push(move)
+            boards.append(board.copy())
+            board.pop()
+    return boards
+
+
+# Time each evaluation term over the boards.
+# Returns rows ranked by total time: name, calls, total_sec, per_call_us, share.
+def profile_terms(boards, repeat=3, terms=None):
+    terms = terms or EVAL_TERMS + REPLACEMENT_TERMS
+    rows = []
+
+    for name, function in terms:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for board in boards:
+                function(board)
+        total = time.perf_counter() - start
+        calls = repeat * len(boards)
+        rows.append({"name": name, "calls": calls, "total_sec": total,
+                     "per_call_us": total / calls * 1e6 if calls else 0.0})
+
+    # Share of a full evaluate(): the replacements are left out of the sum
+    full_terms = {name for name, _ in EVAL_TERMS}
+    full = sum(row["total_sec"] for row in rows if row["name"] in full_terms)
+    for row in rows:
+        row["share"] = row["total_sec"] / full if full else 0.0
+
+    rows.sort(key=lambda row: row["total_sec"], reverse=True)
+    return rows
+
+
+def format_terms(rows):
+    lines = [f"{'term':<16}{'calls':>8}{'total s':>10}{'us/call':>10}{'share':>8}"]
+    for row in rows:
+        lines.append(f"{row['name']:<16}{row['calls']:>8}{row['total_sec']:>10.3f}"
+                     f"{row['per_call_us']:>10.1f}{row['share']:>8.1%}")
+    return "\n".join(lines)
+
+
+# Run evaluate (or evaluate_fast) over the boards under a profiler.
+# profiler is "cprofile" or "pyinstrument" (optional dependency).
+# Returns the profiler report as text.
+def profile_evaluate(boards, profiler="cprofile", repeat=3, fast=False, limit=25):
+    function = evaluate_fast if fast else evaluate
+
+    def run():
+        for _ in range(repeat):
+            for board in boards:
+                function(board)
+
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise RuntimeError("pyinstrument is not installed (pip install pyinstrument)")
+        prof = Profiler()
+        prof.start()
+        run()
+        prof.stop()
+        return prof.output_text(unicode=True, color=False)
+
+    if profiler != "cprofile":
+        raise ValueError(f"unknown profiler: {profiler}")
+
+    prof = cProfile.Profile()
+    prof.enable()
+    run()
+    prof.disable()
+    out = io.StringIO()
+    pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
@@ -1,8 +1,9 @@
 import chess as ch
-from ai.utils import count_doubled_pawns
-from ai.utils import count_isolated_pawns
-from ai.utils import count_passed_pawns
 from ai.utils import can_checkmate_in_one
+from ai.utils import pseudo_mobility
+from ai.utils import count_check_threats
+from ai.pawn_hash import pawn_hash
+from ai.moves import gives_check
 
 material_values = {
     ch.PAWN: 1 * 0.2,
@@ -98,7 +99,53 @@ mateScore = 30
 nearMate = 12
 drawScore = -2 # penalty for draw
 
-def evaluate(board):
+# Weights of the terms in the evaluation
+PAWN_STRUCTURE_WEIGHT = 0.2
+MOBILITY_WEIGHT = 0.2
+KING_WEIGHT = 0.2
+CHECK_WEIGHT = 0.5
+
+# inc: optional IncrementalEvaluator (ai/incremental.py) kept in sync with board,
+# its running sums replace the material, piece position and center scans.
+# turn: side that gets the initiative bonus, defaults to the side to move
+def evaluate(board, inc=None, turn=None):
+    forced = forced_score(board)
+    if forced is not None:
+        return forced
+
+    return weighted_score(static_terms(board, inc), evaluate_bishop(board), evaluate_pawn_structure(board),
+                          evaluate_mobility(board), evaluate_king(board), evaluate_check(board),
+                          board.turn if turn is None else turn)
+
+
+# Material + piece position + center, from the incremental sums when kept
+def static_terms(board, inc):
+    if inc is not None:
+        return inc.material + inc.piecepos + inc.center
+    return evaluate_material(board) + evaluate_piecepos(board) + evaluate_center(board)
+
+
+# The sum every evaluator returns, from its term values: evaluate(),
+# evaluate_fast() and the bitboard versions in ai/bitboard_eval.py only
+# differ in how the terms are worked out. static is material + piece
+# position + center, turn gets the initiative bonus.
+def weighted_score(static, bishop, pawn_structure, mobility, king, check, turn):
+    score = static
+    score += bishop
+    score += pawn_structure * PAWN_STRUCTURE_WEIGHT
+    score += mobility * MOBILITY_WEIGHT
+    score += king * KING_WEIGHT
+    score += check * CHECK_WEIGHT
+
+    # Initiative bonus
+    score += initiative_bonus(turn)
+
+    return score
+
+
+# Mates, draws and mates in one: the scores evaluate() returns without
+# looking at the rest of the position, None otherwise
+def forced_score(board):
 
      # Black wins
     if board.is_checkmate() and board.turn == ch.WHITE:
@@ -121,22 +168,42 @@ def evaluate(board):
         if can_checkmate_in_one(board, ch.WHITE):
             return -nearMate
 
+    return None
 
-    score = 0.0
 
-    score += evaluate_material(board)
-    score += evaluate_piecepos(board)
-    score += evaluate_center(board)
-    score += evaluate_bishop(board)
-    score += evaluate_pawn_structure(board) * 0.2
-    score += evaluate_mobility(board) * 0.2
-    score += evaluate_king(board) * 0.2
-    score += evaluate_check(board) * 0.5
+# Bonus for the side to move.
+# Quiescence search passes the side to move at the horizon so positions
+# a capture apart are scored with the same bonus.
+def initiative_bonus(turn):
+    return 5 if turn == ch.WHITE else -5
 
-    # Initiative bonus
-    score += 5 if board.turn == ch.WHITE else -5
 
-    return score
+# Score of a finished game, or None while it goes on.
+# Same rules evaluate() starts with, so the search can work this out
+# once per node and skip it in evaluate_fast.
+def terminal_score(board):
+    outcome = board.outcome()
+    if outcome is not None:
+        if outcome.winner == ch.BLACK:
+            return mateScore
+        elif outcome.winner == ch.WHITE:
+            return -mateScore
+        return drawScore
+
+    if board.is_fifty_moves() or board.is_repetition():
+        return drawScore
+
+    return None
+
+
+# Cheaper evaluate() for the leaves of the search.
+# Expects a position terminal_score() said is not over, skips the mate in one
+# scan and takes mobility and check threats from attack bitboards instead of
+# generating legal moves.
+def evaluate_fast(board, inc=None, turn=None):
+    return weighted_score(static_terms(board, inc), evaluate_bishop(board), evaluate_pawn_structure(board),
+                          evaluate_mobility_fast(board), evaluate_king(board), evaluate_check_fast(board),
+                          board.turn if turn is None else turn)
 
 
 # Evaluate potential for creating check
@@ -148,11 +215,11 @@ def evaluate_check(board):
 
     # Evaluate check by Black
     board.turn = ch.BLACK
-    black_check_moves = sum(1 for move in board.legal_moves if board.gives_check(move))
+    black_check_moves = sum(1 for move in board.legal_moves if gives_check(board, move))
 
     # Evaluate check threats by White (human)
     board.turn = ch.WHITE
-    white_check_moves = sum(1 for move in board.legal_moves if board.gives_check(move))
+    white_check_moves = sum(1 for move in board.legal_moves if gives_check(board, move))
 
     # Restore original turn
     board.turn = original_turn
@@ -163,6 +230,13 @@ def evaluate_check(board):
 
     return score
 
+# Check threats counted from attack masks
+def evaluate_check_fast(board):
+    black_check_moves = count_check_threats(board, ch.BLACK)
+    white_check_moves = count_check_threats(board, ch.WHITE)
+
+    return (black_check_moves - white_check_moves) * 0.2
+
 # Eval score for material counting
 def evaluate_material(board):
     score = 0
@@ -250,6 +324,13 @@ def evaluate_mobility(board):
 
     return score
 
+# Mobility from pseudo-legal attack bitboards
+def evaluate_mobility_fast(board):
+    bMobility = pseudo_mobility(board, ch.BLACK)
+    wMobility = pseudo_mobility(board, ch.WHITE)
+
+    return (bMobility - wMobility) * 0.1
+
 # Eval king safety method
 def evaluate_king(board):
     score = 0.0
@@ -397,69 +478,7 @@ def count_open_files_near_king(board, king_file):
     return open_files_count
 
 
-# Eval score for entire pawn struct
+# Eval score for entire pawn struct.
+# Computed on the pawn bitboards and cached by them (ai/pawn_hash.py)
 def evaluate_pawn_structure(board):
-    score = 0
-
-    # Get pawns for each color
-    white_pawns = list(board.pieces(ch.PAWN, ch.WHITE))
-    black_pawns = list(board.pieces(ch.PAWN, ch.BLACK))
-
-    # Evaluate doubled pawns (same file)
-    w_doubled = count_doubled_pawns(white_pawns)
-    b_doubled = count_doubled_pawns(black_pawns)
-    # Doubled pawns are bad (negative for white, positive for black)
-    score += w_doubled * 0.5
-    score -= b_doubled * 0.5
-
-    # Evaluate isolated pawns (no friendly pawns on adjacent files)
-    w_isolated = count_isolated_pawns(white_pawns)
-    b_isolated = count_isolated_pawns(black_pawns)
-    # Isolated pawns are bad (negative for white, positive for black)
-    score += w_isolated * 0.3
-    score -= b_isolated * 0.3
-
-    # Evaluate passed pawns (no enemy pawns ahead on same or adjacent files)
-    w_passed = count_passed_pawns(board, white_pawns, ch.WHITE)
-    b_passed = count_passed_pawns(board, black_pawns, ch.BLACK)
-    # Passed pawns are good (positive for white, negative for black)
-    score -= w_passed * 0.6
-    score += b_passed * 0.6
-
-    # Evaluate pawn chains
-    w_chain = evaluate_pawn_chains(white_pawns, ch.WHITE)
-    b_chain = evaluate_pawn_chains(black_pawns, ch.BLACK)
-    # Pawn chains are good (positive for white, negative for black)
-    score -= w_chain * 0.4
-    score += b_chain * 0.4
-
-    return score
-
-# Eval score for pawns that protect other pawns
-def evaluate_pawn_chains(pawns, color):
-    chain_value = 0
-
-    for pawn in pawns:
-        file_index = pawn % 8
-        rank_index = pawn // 8
-
-        # Calculate potential protecting pawn positions
-        if color == ch.WHITE:
-            protector_squares = []
-            if file_index > 0 and rank_index > 0:
-                protector_squares.append((rank_index - 1) * 8 + (file_index - 1))  # Diagonal left
-            if file_index < 7 and rank_index > 0:
-                protector_squares.append((rank_index - 1) * 8 + (file_index + 1))  # Diagonal right
-        else:  # BLACK
-            protector_squares = []
-            if file_index > 0 and rank_index < 7:
-                protector_squares.append((rank_index + 1) * 8 + (file_index - 1))  # Diagonal left
-            if file_index < 7 and rank_index < 7:
-                protector_squares.append((rank_index + 1) * 8 + (file_index + 1))  # Diagonal right
-
-        # Check if any of these squares have a friendly pawn
-        for square in protector_squares:
-            if square in pawns:
-                chain_value += 1
-
-    return chain_value
+    return pawn_hash.score(board)
@@ -0,0 +1,86 @@
+import chess as ch
+from ai.evaluation import material_values, piece_tables, center_cells
+
+# Per piece/colour/square contributions of evaluate_material, evaluate_piecepos
+# and evaluate_center, computed the same way those functions do.
+# Indexed as values[color][piece_type][square].
+def _build_tables():
+    material = {ch.WHITE: {}, ch.BLACK: {}}
+    piecepos = {ch.WHITE: {}, ch.BLACK: {}}
+    center = {ch.WHITE: [0.0] * 64, ch.BLACK: [0.0] * 64}
+
+    for piece_type, table in piece_tables.items():
+        material[ch.BLACK][piece_type] = [material_values[piece_type]] * 64
+        material[ch.WHITE][piece_type] = [-material_values[piece_type]] * 64
+
+        piecepos[ch.BLACK][piece_type] = [table[cell] * 0.1 for cell in ch.SQUARES]
+        # same (mirrored) index evaluate_piecepos uses for white pieces
+        piecepos[ch.WHITE][piece_type] = [-(table[7 - (cell // 8) * 8 + (cell % 8)] * 0.1) for cell in ch.SQUARES]
+
+    for cell in center_cells:
+        center[ch.BLACK][cell] = 0.1
+        center[ch.WHITE][cell] = -0.1
+
+    return material, piecepos, center
+
+material_table, piecepos_table, center_table = _build_tables()
+
+
+# Sum of the three terms over some squares of the board
+def square_sums(board, squares):
+    material = 0.0
+    piecepos = 0.0
+    center = 0.0
+    white = board.occupied_co[ch.WHITE]
+
+    for cell in squares:
+        piece_type = board.piece_type_at(cell)
+        if piece_type:
+            color = bool(white & ch.BB_SQUARES[cell])
+            material += material_table[color][piece_type][cell]
+            piecepos += piecepos_table[color][piece_type][cell]
+            center += center_table[color][cell]
+
+    return material, piecepos, center
+
+
+# Squares whose contents can change when `move` is played
+def touched_squares(board, move):
+    if not move:
+        return ()  # null move
+    if board.is_castling(move):
+        rank = ch.square_rank(move.from_square)
+        return [ch.square(f, rank) for f in range(8)]
+    if board.is_en_passant(move):
+        captured = ch.square(ch.square_file(move.to_square), ch.square_rank(move.from_square))
+        return (move.from_square, move.to_square, captured)
+    return (move.from_square, move.to_square)
+
+
+# Keeps material, piece-square and center scores as running sums.
+# Use push/pop instead of board.push/board.pop inside the search so
+# evaluate(board, inc) doesn't rescan the 64 squares at every leaf.
+class IncrementalEvaluator:
+
+    def __init__(self, board):
+        self.reset(board)
+
+    def reset(self, board):
+        self.material, self.piecepos, self.center = square_sums(board, ch.SQUARES)
+        self.stack = []
+
+    def push(self, board, move):
+        squares = touched_squares(board, move)
+        before = square_sums(board, squares)
+        board.push(move)
+        after = square_sums(board, squares)
+
+        # Keep old sums so pop restores them exactly
+        self.stack.append((self.material, self.piecepos, self.center))
+        self.material += after[0] - before[0]
+        self.piecepos += after[1] - before[1]
+        self.center += after[2] - before[2]
+
+    def pop(self, board):
+        self.material, self.piecepos, self.center = self.stack.pop()
+        return board.pop()
@@ -1,41 +1,416 @@
 import chess
-from ai.evaluation import evaluate
-from ai.utils import sort_moves
+import time
+from ai.evaluation import evaluate, evaluate_fast, terminal_score, mateScore, drawScore, material_values
+from ai.utils import sort_moves, mvv_lva_score
+from ai.transposition import TranspositionTable, position_key, reusable, EXACT, LOWER, UPPER
+from ai.incremental import IncrementalEvaluator
+from ai.bitboard_eval import evaluate_bitboard, evaluate_bitboard_fast
+from ai.ordering import MoveOrdering
+from ai.stats import SearchStats
+from ai.moves import gives_check
+
+# Shared table so consecutive moves of a game reuse earlier work
+transposition_table = TranspositionTable()
+
+# Deepest iteration tried when only a time budget is given
+MAX_DEPTH = 32
+
+# How often (in nodes) the clock is looked at
+TIME_CHECK_NODES = 16
+
+# Quiescence search limits
+QUIESCENCE_MAX_DEPTH = 8     # plies of captures past the horizon
+QUIESCENCE_CHECK_PLIES = 1   # plies where quiet checking moves are also tried
+DELTA_MARGIN = material_values[chess.PAWN] * 2  # slack on top of the captured piece
+
+
+# Raised inside the search once the time budget is used up
+class SearchTimeout(Exception):
+    pass
+
+
+# State shared by every node of one search
+class SearchContext:
+
+    def __init__(self, tt=None, deadline=None, inc=None, fast_eval=False, quiescence=False,
+                 stats=None, callback=None, bitboard_eval=False, ordering=None, pvs=False,
+                 tablebase=None, stop=None):
+        self.tt = tt
+        self.deadline = deadline
+        self.stop = stop  # threading.Event (or any is_set() object) that ends the search early, or None
+        self.inc = inc  # IncrementalEvaluator following the board, or None
+        self.fast_eval = fast_eval
+        self.bitboard_eval = bitboard_eval
+        if bitboard_eval:
+            self.evaluator = evaluate_bitboard_fast if fast_eval else evaluate_bitboard
+        else:
+            self.evaluator = evaluate_fast if fast_eval else evaluate
+        self.quiescence = quiescence
+        self.stats = stats if stats is not None else SearchStats()
+        self.callback = callback  # called with stats after each finished iteration
+        self.pv_moves = {}  # position key -> move of the previous principal variation
+        self.ordering = ordering  # MoveOrdering (killers/history), or None for plain sort_moves
+        self.pvs = pvs
+        self.tablebase = tablebase  # Tablebase probed at small enough nodes, or None
+        self.iteration_scores = {}  # depth -> score of each finished iteration
+        self.cache_path = None  # SearchCache file parallel workers warm-start from
+
+    def push(self, board, move):
+        if self.inc is not None:
+            self.inc.push(board, move)
+        else:
+            board.push(move)
+
+    def pop(self, board):
+        if self.inc is not None:
+            return self.inc.pop(board)
+        return board.pop()
+
+    def evaluate(self, board, turn=None):
+        self.stats.leaf_evals += 1
+        return self.evaluator(board, self.inc, turn)
+
+    # Score of the node if the search stops here, otherwise None.
+    # In fast mode the game-over test is done once here and evaluate_fast
+    # doesn't repeat it.
+    def leaf_score(self, board, depth):
+        if self.tablebase is not None:
+            score = self.tablebase.score(board)
+            if score is not None:
+                self.stats.tb_hits += 1
+                return score
+
+        if self.fast_eval:
+            score = terminal_score(board)
+            if score is None and depth == 0:
+                self.stats.leaf_evals += 1
+                score = self.evaluator(board, self.inc)
+            return score
+
+        if depth == 0 or board.is_game_over():
+            self.stats.leaf_evals += 1
+            return self.evaluator(board, self.inc)
+        return None
+
+    # Legal moves in the order the search tries them
+    def order_moves(self, board, tt_move=None, pv_move=None):
+        if self.ordering is not None:
+            return self.ordering.order(board, tt_move, pv_move)
+        return order_moves(board, tt_move, pv_move)
+
+    # Moves of an interior node: generated in stages when there is a
+    # MoveOrdering, so a cutoff skips generating the rest
+    def node_moves(self, board, tt_move=None, pv_move=None):
+        if self.ordering is not None:
+            return self.ordering.staged(board, tt_move, pv_move)
+        return order_moves(board, tt_move, pv_move)
+
+    # Beta cutoff by the move at `index` of the node's move list
+    def cutoff(self, board, move, depth, index):
+        self.stats.count_cutoff(index)
+        if self.ordering is not None:
+            self.ordering.cutoff(board, move, depth)
+
+    def count_node(self):
+        self.stats.nodes += 1
+        if self.stats.nodes % TIME_CHECK_NODES == 0 and self.stopped():
+            raise SearchTimeout()
+
+    # Out of time, or told to stop
+    def stopped(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return self.stop is not None and self.stop.is_set()
+
+    # Record a finished iteration in the stats and tell the callback
+    def finish_iteration(self, board, depth, score, best_move):
+        pv = [move for _, move in principal_variation(board, self.tt, depth)] if self.tt is not None else []
+        if best_move is not None and (not pv or pv[0] != best_move):
+            pv = [best_move]
+        self.iteration_scores[depth] = score
+        self.stats.finish_iteration(depth, score, best_move, pv)
+        if self.callback is not None:
+            self.callback(self.stats)
+
+
+# Pick a move for the side to move (scores are from black's side, so the
+# root maximizes for black and minimizes for white).
+# With only `depth` the search runs once at that depth (original behaviour).
+# With `max_time` (seconds) it deepens one ply at a time up to `max_depth`
+# and returns the move of the last iteration that finished in time.
+# incremental=True keeps material/piece-square/center scores as running sums.
+# fast_eval=True scores leaves with evaluate_fast instead of evaluate.
+# bitboard_eval=True uses the bitboard versions of either (ai/bitboard_eval.py).
+# history_ordering=True orders moves with killers, countermoves and history
+# (ai/ordering.py), False with the plain sort_moves order.
+# quiescence=True keeps searching captures (and checks) past the last ply.
+# pvs=True uses the negamax principal variation search with null move pruning,
+# late move reductions and aspiration windows (ai/pvs.py) instead of minimax.
+# workers>1 searches the root moves in that many processes (ai/parallel.py).
+# stats: a SearchStats to fill in, callback(stats) runs after each iteration.
+# book: an OpeningBook (ai/book.py) whose moves are played without searching.
+# tablebase: a Tablebase (ai/tablebase.py), positions with few enough pieces
+# are looked up instead of searched, at the root and inside the tree.
+# cache: a SearchCache (ai/search_cache.py), the table is warm-started from it
+# and the search's entries are written back to it afterwards.
+# stop: a threading.Event, setting it (from another thread) ends the search
+# with the move of the last finished iteration (None if none finished).
+def find_best_move(board, depth=None, tt=None, max_time=None, max_depth=None, incremental=True,
+                   fast_eval=False, quiescence=False, workers=1, stats=None, callback=None,
+                   bitboard_eval=False, history_ordering=True, pvs=False, book=None, tablebase=None,
+                   cache=None, stop=None):
+    if book is not None:
+        move = book.choose(board)
+        if move is not None:
+            if stats is not None:
+                stats.book = True
+                stats.best_move = move
+                stats.pv = [move]
+            return move
+
+    if tablebase is not None:
+        move = tablebase.best_move(board)
+        if move is not None:
+            if stats is not None:
+                stats.tablebase = True
+                stats.best_move = move
+                stats.pv = [move]
+            return move
+
+    if tt is None:
+        tt = transposition_table
+    tt.new_search()
+    inc = IncrementalEvaluator(board) if incremental else None
+    ctx = SearchContext(tt, inc=inc, fast_eval=fast_eval, quiescence=quiescence,
+                        stats=stats, callback=callback, bitboard_eval=bitboard_eval,
+                        ordering=MoveOrdering() if history_ordering else None, pvs=pvs,
+                        tablebase=tablebase, stop=stop)
+    if cache is not None:
+        from ai.search_cache import cache_namespace
+        namespace = cache_namespace(ctx)
+        ctx.cache_path = cache.path
+        cache.warm(tt, namespace)
+    ctx.stats.start()
+
+    root_search = search_root
+    if pvs:
+        from ai.pvs import search_root_pvs
+        root_search = search_root_pvs
+    if workers > 1:
+        from ai.parallel import parallel_search_root
+        root_search = lambda board, depth, ctx, root_moves=None: parallel_search_root(board, depth, ctx, root_moves, workers)
+
+    if max_time is None:
+        if depth is None:
+            depth = max_depth
+        if depth is None:
+            raise ValueError("find_best_move needs a depth or a max_time")
+        stack_size = len(board.move_stack)
+        try:
+            bestEval, bestMove, _ = root_search(board, depth, ctx)
+            ctx.finish_iteration(board, depth, bestEval, bestMove)
+        except SearchTimeout:
+            # Stopped before the only iteration finished
+            while len(board.move_stack) > stack_size:
+                ctx.pop(board)
+            bestMove = None
+        ctx.stats.stop()
+    else:
+        bestMove = iterative_deepening(board, max_time, max_depth or depth or MAX_DEPTH, ctx, root_search)
+
+    if cache is not None:
+        cache.save(tt, namespace)
+    return bestMove
+
+
+def iterative_deepening(board, max_time, max_depth, ctx, root_search=None):
+    if root_search is None:
+        root_search = search_root
+    start = time.monotonic()
+    ctx.deadline = start + max_time
+    tt = ctx.tt
+
+    root_moves = ctx.order_moves(board)
+    if len(root_moves) <= 1:
+        ctx.stats.stop()
+        return root_moves[0] if root_moves else None
 
-def find_best_move(board, depth):
-    bestEval = float("-inf")
+    finalMove = None
+    stack_size = len(board.move_stack)
+    key = position_key(board)
+
+    depth = 1
+    while depth <= max_depth:
+        nodes = ctx.stats.nodes
+        try:
+            bestEval, bestMove, scores = root_search(board, depth, ctx, root_moves)
+        except SearchTimeout:
+            # Undo whatever the interrupted iteration left on the board
+            while len(board.move_stack) > stack_size:
+                ctx.pop(board)
+            break
+
+        finalMove = bestMove
+        if ctx.stats.nodes == nodes:
+            # Answered by the root entry of an earlier, deeper search: not an
+            # iteration of this one, so it isn't reported. Go on past it.
+            depth = max(depth, tt.probe(key)[0]) + 1
+            continue
+        ctx.finish_iteration(board, depth, bestEval, bestMove)
+
+        # Next iteration: best moves of this one first, and its PV followed first
+        if board.turn == chess.BLACK:
+            root_moves = sorted(root_moves, key=lambda move: scores.get(move, float("-inf")), reverse=True)
+        else:
+            root_moves = sorted(root_moves, key=lambda move: scores.get(move, float("inf")))
+        ctx.pv_moves = dict(principal_variation(board, tt, depth))
+
+        # Found a forced mate, deeper search won't change the move
+        if abs(bestEval) >= mateScore:
+            break
+        # The next iteration is unlikely to finish in the time that is left
+        if time.monotonic() - start > max_time / 2:
+            break
+        depth += 1
+
+    ctx.stats.stop()
+    if finalMove is None:
+        finalMove = root_moves[0]
+    return finalMove
+
+
+# Search every root move at `depth`.
+# Returns (best score, best move, {move: score}).
+def search_root(board, depth, ctx, root_moves=None):
+    key = position_key(board)
+    entry = ctx.tt.probe(key)
+    tt_move = None
+    if entry is not None:
+        tt_move = entry[3]
+        # Already searched this position deep enough
+        if reusable(entry[0], depth) and entry[1] == EXACT and tt_move in board.legal_moves:
+            return entry[2], tt_move, {tt_move: entry[2]}
+
+    # Scores are from black's side: black maximizes, white minimizes
+    is_maxing = board.turn == chess.BLACK
+    bestEval = float("-inf") if is_maxing else float("inf")
     finalMove = None
     alpha = float("-inf")
     beta = float("inf")
+    scores = {}
 
-    moves_sorted = sort_moves(board, board.legal_moves, True)
-    for move in moves_sorted:
-        board.push(move)
-        eval_val = minimax(board, depth-1, alpha, beta, False)[0]
-        board.pop()
+    if root_moves is None:
+        root_moves = ctx.order_moves(board, tt_move, ctx.pv_moves.get(key))
+    for move in root_moves:
+        ctx.push(board, move)
+        eval_val = minimax(board, depth-1, alpha, beta, not is_maxing, ctx)[0]
+        ctx.pop(board)
+        scores[move] = eval_val
 
-        if eval_val > bestEval:
+        if is_maxing and eval_val > bestEval:
+            bestEval = eval_val
+            finalMove = move
+        elif not is_maxing and eval_val < bestEval:
             bestEval = eval_val
             finalMove = move
 
-        alpha = max(alpha, eval_val)
+        if is_maxing:
+            alpha = max(alpha, eval_val)
+        else:
+            beta = min(beta, eval_val)
 
-    return finalMove
+    if finalMove is not None:
+        ctx.tt.store(key, depth, EXACT, bestEval, finalMove)
+
+    return bestEval, finalMove, scores
+
+
+# Follow best moves stored in the table from the root.
+# Returns [(position key, move), ...] for the line.
+def principal_variation(board, tt, depth):
+    pv = []
+    seen = set()
+    for _ in range(depth):
+        key = position_key(board)
+        entry = tt.probe(key)
+        if entry is None or entry[3] is None or key in seen or not board.is_legal(entry[3]):
+            break
+        seen.add(key)
+        pv.append((key, entry[3]))
+        board.push(entry[3])
+    for _ in range(len(pv)):
+        board.pop()
+    return pv
+
+
+# Draw by threefold repetition or the fifty move rule. Both depend on the
+# moves that led to the position, which table entries know nothing about,
+# so the search checks them before probing and never stores them.
+def path_draw(board):
+    # Neither is possible within 8 reversible plies
+    return board.halfmove_clock >= 8 and (board.is_fifty_moves() or board.is_repetition())
+
+
+# Sorted legal moves with the PV move, then the table move, tried first
+def order_moves(board, tt_move, pv_move=None):
+    moves_sorted = sort_moves(board, board.legal_moves, True)
+    for move in (tt_move, pv_move):
+        if move is not None and move in moves_sorted:
+            moves_sorted.remove(move)
+            moves_sorted.insert(0, move)
+    return moves_sorted
+
+def minimax(board, depth, alpha, beta, is_maxing, ctx=None):
+    if ctx is None:
+        ctx = SearchContext()
+    if depth <= 0 and ctx.quiescence:
+        return quiescence(board, alpha, beta, is_maxing, ctx), None
+    ctx.count_node()
+    if path_draw(board):
+        return drawScore, None
 
-def minimax(board, depth, alpha, beta, is_maxing):
-    if depth==0 or board.is_game_over():
-        return evaluate(board),None
+    key = None
+    tt_move = None
+    tt = ctx.tt
+    stats = ctx.stats
+    if tt is not None:
+        key = position_key(board)
+        entry = tt.probe(key)
+        stats.tt_probes += 1
+        if entry is not None:
+            stats.tt_hits += 1
+            entry_depth, bound, score, tt_move = entry
+            if reusable(entry_depth, depth):
+                if bound == EXACT:
+                    stats.tt_cutoffs += 1
+                    return score, tt_move
+                elif bound == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    stats.tt_cutoffs += 1
+                    return score, tt_move
 
+    score = ctx.leaf_score(board, depth)
+    if score is not None:
+        if tt is not None:
+            tt.store(key, depth, EXACT, score, None)
+        return score,None
+
+    alpha_orig = alpha
+    beta_orig = beta
     finalMove = None
+    pv_move = ctx.pv_moves.get(key) if key is not None else None
 
     if is_maxing:
         bestEval = float("-inf")
 
-        moves_sorted = sort_moves(board, board.legal_moves, True)
-        for move in moves_sorted:
-            board.push(move)
-            eval_val = minimax(board, depth-1,alpha, beta, False)[0]
-            board.pop()
+        moves_sorted = ctx.node_moves(board, tt_move, pv_move)
+        for index, move in enumerate(moves_sorted):
+            ctx.push(board, move)
+            eval_val = minimax(board, depth-1,alpha, beta, False, ctx)[0]
+            ctx.pop(board)
 
             if eval_val > bestEval:
                 bestEval = eval_val
@@ -43,26 +418,112 @@ def minimax(board, depth, alpha, beta, is_maxing):
 
             alpha = max(alpha, eval_val)
             if beta <= alpha:
+                ctx.cutoff(board, move, depth, index)
                 break
 
-        return bestEval, finalMove
-
     else:
-        minEval = float("inf")
+        bestEval = float("inf")
 
-        moves_sorted = sort_moves(board, board.legal_moves, True)
-        for move in moves_sorted:
-            board.push(move)
-            eval_val = minimax(board, depth-1, alpha, beta, True)[0]
-            board.pop()
+        moves_sorted = ctx.node_moves(board, tt_move, pv_move)
+        for index, move in enumerate(moves_sorted):
+            ctx.push(board, move)
+            eval_val = minimax(board, depth-1, alpha, beta, True, ctx)[0]
+            ctx.pop(board)
 
-            if eval_val < minEval:
-                minEval = eval_val
+            if eval_val < bestEval:
+                bestEval = eval_val
                 finalMove = move
 
             beta = min(beta, eval_val)
             if beta <= alpha:
+                ctx.cutoff(board, move, depth, index)
                 break
 
-        return minEval, finalMove
+    if tt is not None:
+        if bestEval <= alpha_orig:
+            bound = UPPER
+        elif bestEval >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        tt.store(key, depth, bound, bestEval, finalMove)
+
+    return bestEval, finalMove
+
+
+# Search captures (and, near the horizon, checks) until the position is quiet.
+# The side to move may stand pat on the static score unless it is in check.
+# turn is the side to move at the horizon, used for the initiative bonus so
+# every position in here is scored on the same footing.
+def quiescence(board, alpha, beta, is_maxing, ctx, turn=None, qdepth=0):
+    ctx.count_node()
+    ctx.stats.qnodes += 1
+    if turn is None:
+        turn = board.turn
+
+    if ctx.fast_eval:
+        score = terminal_score(board)
+        if score is not None:
+            return score
+    # evaluate() itself scores mates and draws
+    stand_pat = ctx.evaluate(board, turn)
+    if abs(stand_pat) >= mateScore or qdepth >= QUIESCENCE_MAX_DEPTH:
+        return stand_pat
+
+    in_check = board.is_check()
+    if in_check:
+        # No standing pat while in check, every evasion is searched
+        bestEval = float("-inf") if is_maxing else float("inf")
+        moves = sort_moves(board, board.legal_moves, True)
+    else:
+        bestEval = stand_pat
+        if is_maxing:
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+        else:
+            if stand_pat <= alpha:
+                return stand_pat
+            beta = min(beta, stand_pat)
+        moves = quiescence_moves(board, qdepth < QUIESCENCE_CHECK_PLIES)
+
+    for index, move in enumerate(moves):
+        # Delta pruning: even winning the piece can't reach the window
+        if not in_check and not move.promotion and board.is_capture(move):
+            victim = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+            gain = material_values[victim] + DELTA_MARGIN
+            if (is_maxing and stand_pat + gain <= alpha) or (not is_maxing and stand_pat - gain >= beta):
+                continue
+
+        ctx.push(board, move)
+        eval_val = quiescence(board, alpha, beta, not is_maxing, ctx, turn, qdepth + 1)
+        ctx.pop(board)
+
+        if is_maxing:
+            bestEval = max(bestEval, eval_val)
+            alpha = max(alpha, eval_val)
+        else:
+            bestEval = min(bestEval, eval_val)
+            beta = min(beta, eval_val)
+        if beta <= alpha:
+            ctx.stats.count_cutoff(index)
+            break
+
+    if bestEval in (float("-inf"), float("inf")):
+        # In check without legal moves, evaluate() already scored the mate
+        return stand_pat
+    return bestEval
+
+
+# Captures and promotions in MVV-LVA order, then (optionally) quiet checks
+def quiescence_moves(board, with_checks):
+    captures = []
+    checks = []
+    for move in board.legal_moves:
+        if board.is_capture(move) or move.promotion:
+            captures.append(move)
+        elif with_checks and gives_check(board, move):
+            checks.append(move)
 
+    captures.sort(key=lambda move: mvv_lva_score(board, move), reverse=True)
+    return captures + checks
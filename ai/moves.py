@@ -0,0 +1,102 @@
+import chess as ch
+
+# Lean move helpers for the search core.
+#
+# gives_check() answers board.gives_check() from the bitboards: python-chess
+# does a full push() + is_check() + pop() for it, allocating a board state
+# snapshot each time, and the evaluation asks it for every legal move of
+# both sides at every leaf.
+#
+# pack_move() / unpack_move() store moves as 15 bit ints
+# (from | to << 6 | promotion << 12), e.g. in the transposition table, with
+# one shared chess.Move per code instead of a Move object per entry.
+
+_MOVES = [None] * (1 << 15)  # code -> chess.Move, filled as codes are unpacked
+
+
+def pack_move(move):
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def unpack_move(code):
+    if code is None:
+        return None
+    move = _MOVES[code]
+    if move is None:
+        move = _MOVES[code] = ch.Move(code & 63, code >> 6 & 63, code >> 12 or None)
+    return move
+
+
+# Same answer as board.gives_check(move) for a pseudo-legal move, without
+# playing it: the pieces of the side to move are moved on copies of the
+# bitboards and the enemy king's attackers are looked up with the new
+# occupancy (direct checks, discovered checks, castling rook, en passant).
+def gives_check(board, move):
+    color = board.turn
+    them = not color
+    king = board.king(them)
+    if king is None or not move or move.to_square == king:
+        return False
+
+    own = board.occupied_co[color]
+    occupied = board.occupied
+    from_bb = ch.BB_SQUARES[move.from_square]
+    to_bb = ch.BB_SQUARES[move.to_square]
+
+    pawns = board.pawns & own
+    knights = board.knights & own
+    diagonal = (board.bishops | board.queens) & own
+    straight = (board.rooks | board.queens) & own
+    kings = board.kings & own
+
+    piece_type = board.piece_type_at(move.from_square)
+
+    if piece_type == ch.KING and board.is_castling(move):
+        rank = ch.square_rank(move.from_square)
+        if to_bb & own & board.rooks:
+            rook_square = move.to_square  # king takes rook notation
+        else:
+            rook_square = ch.square(7 if move.to_square > move.from_square else 0, rank)
+        queenside = rook_square < move.from_square
+        king_to = ch.BB_SQUARES[ch.square(2 if queenside else 6, rank)]
+        rook_to = ch.BB_SQUARES[ch.square(3 if queenside else 5, rank)]
+        rook_bb = ch.BB_SQUARES[rook_square]
+        occupied = (occupied & ~from_bb & ~rook_bb) | king_to | rook_to
+        straight = (straight & ~rook_bb) | rook_to
+        kings = king_to
+    else:
+        occupied = (occupied & ~from_bb) | to_bb
+        if piece_type == ch.PAWN and board.is_en_passant(move):
+            occupied &= ~ch.BB_SQUARES[board.ep_square + (-8 if color == ch.WHITE else 8)]
+
+        new_type = move.promotion or piece_type
+        if piece_type == ch.PAWN:
+            pawns &= ~from_bb
+        elif piece_type == ch.KNIGHT:
+            knights &= ~from_bb
+        elif piece_type == ch.KING:
+            kings &= ~from_bb
+        else:
+            diagonal &= ~from_bb
+            straight &= ~from_bb
+
+        if new_type == ch.PAWN:
+            pawns |= to_bb
+        elif new_type == ch.KNIGHT:
+            knights |= to_bb
+        elif new_type == ch.KING:
+            kings |= to_bb
+        else:
+            if new_type != ch.ROOK:
+                diagonal |= to_bb
+            if new_type != ch.BISHOP:
+                straight |= to_bb
+
+    return bool(
+        knights & ch.BB_KNIGHT_ATTACKS[king]
+        or pawns & ch.BB_PAWN_ATTACKS[them][king]
+        or kings & ch.BB_KING_ATTACKS[king]
+        or diagonal & ch.BB_DIAG_ATTACKS[king][ch.BB_DIAG_MASKS[king] & occupied]
+        or straight & (ch.BB_RANK_ATTACKS[king][ch.BB_RANK_MASKS[king] & occupied]
+                       | ch.BB_FILE_ATTACKS[king][ch.BB_FILE_MASKS[king] & occupied])
+    )
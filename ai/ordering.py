@@ -0,0 +1,113 @@
+import chess as ch
+from ai.utils import mvv_lva_score
+
+# Sort keys of MoveOrdering.order, higher is tried first
+PV_MOVE_SCORE = (1 << 30) + 1
+TT_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 24        # plus the MVV-LVA score
+KILLER_SCORES = (1 << 23, (1 << 23) - 1)
+COUNTERMOVE_SCORE = 1 << 22
+HISTORY_MAX = 1 << 20          # history is halved once a value gets here
+
+KILLERS_PER_PLY = 2
+
+
+# Move ordering that learns from the search.
+# TT/PV move first, then captures and promotions by MVV-LVA, then the quiet
+# moves that recently caused beta cutoffs: killers of this ply, the reply
+# to the opponent's last move (countermove), and the rest by history score.
+# Moves are only classified, no gives_check() per move.
+# One instance lives for a whole search (all iterations of it).
+class MoveOrdering:
+
+    def __init__(self):
+        self.killers = {}  # ply -> [move, ...] most recent first
+        self.history = {ch.WHITE: [0] * 4096, ch.BLACK: [0] * 4096}  # [color][from * 64 + to]
+        self.countermoves = {}  # opponent's move -> quiet reply that cut off
+
+    def clear(self):
+        self.killers.clear()
+        self.countermoves.clear()
+        for table in self.history.values():
+            table[:] = [0] * 4096
+
+    def move_key(self, board, move, tt_move, pv_move, killers, countermove, history):
+        if move == pv_move:
+            return PV_MOVE_SCORE
+        if move == tt_move:
+            return TT_MOVE_SCORE
+        if move.promotion or board.is_capture(move):
+            return CAPTURE_SCORE + mvv_lva_score(board, move)
+        if move in killers:
+            return KILLER_SCORES[killers.index(move)]
+        if move == countermove:
+            return COUNTERMOVE_SCORE
+        return history[move.from_square * 64 + move.to_square]
+
+    # Legal moves of the position, best candidates first
+    def order(self, board, tt_move=None, pv_move=None):
+        killers = self.killers.get(len(board.move_stack), ())
+        countermove = self.countermoves.get(board.move_stack[-1]) if board.move_stack else None
+        history = self.history[board.turn]
+
+        moves = list(board.legal_moves)
+        moves.sort(key=lambda move: self.move_key(board, move, tt_move, pv_move, killers, countermove, history),
+                   reverse=True)
+        return moves
+
+    # Same order as order(), generated in stages as the search asks for
+    # moves: PV/TT move, captures and promotions, killers and countermove,
+    # then the remaining quiet moves. A node that cuts off early never
+    # generates (or sorts) the quiet moves.
+    def staged(self, board, tt_move=None, pv_move=None):
+        done = set()
+
+        for move in (pv_move, tt_move):
+            if move is not None and move not in done and board.is_legal(move):
+                done.add(move)
+                yield move
+
+        them = board.occupied_co[not board.turn]
+        promotion_rank = ch.BB_RANK_8 if board.turn == ch.WHITE else ch.BB_RANK_1
+        ep_square = ch.BB_SQUARES[board.ep_square] if board.ep_square is not None else 0
+        captures = [move for move in board.generate_legal_moves(ch.BB_ALL, them | promotion_rank | ep_square)
+                    if move not in done and (move.promotion or board.is_capture(move))]
+        captures.sort(key=lambda move: mvv_lva_score(board, move), reverse=True)
+        for move in captures:
+            done.add(move)
+            yield move
+
+        killers = self.killers.get(len(board.move_stack), ())
+        countermove = self.countermoves.get(board.move_stack[-1]) if board.move_stack else None
+        for move in (*killers, countermove):
+            if (move is not None and move not in done and not move.promotion
+                    and not board.is_capture(move) and board.is_legal(move)):
+                done.add(move)
+                yield move
+
+        history = self.history[board.turn]
+        quiets = [move for move in board.generate_legal_moves(ch.BB_ALL, ~them) if move not in done]
+        quiets.sort(key=lambda move: history[move.from_square * 64 + move.to_square], reverse=True)
+        yield from quiets
+
+    # `move` caused a beta cutoff at `depth` (board is the position it was played in)
+    def cutoff(self, board, move, depth):
+        if move.promotion or board.is_capture(move):
+            return
+
+        ply = len(board.move_stack)
+        killers = self.killers.setdefault(ply, [])
+        if move in killers:
+            killers.remove(move)
+        killers.insert(0, move)
+        del killers[KILLERS_PER_PLY:]
+
+        if board.move_stack:
+            self.countermoves[board.move_stack[-1]] = move
+
+        history = self.history[board.turn]
+        index = move.from_square * 64 + move.to_square
+        history[index] += depth * depth
+        if history[index] >= HISTORY_MAX:
+            for table in self.history.values():
+                table[:] = [value // 2 for value in table]
@@ -0,0 +1,258 @@
+import chess
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from ai.minimax import SearchContext, SearchTimeout, minimax
+from ai.ordering import MoveOrdering
+from ai.transposition import TranspositionTable, position_key, reusable, EXACT
+from ai.incremental import IncrementalEvaluator
+
+# Seconds between looks at the stop event while waiting for the workers
+STOP_POLL = 0.05
+
+# Pools are expensive to start, keep one per worker count:
+# workers -> (pool, shared alpha, current search number)
+_pools = {}
+
+# Worker process state, filled by _init_worker
+_worker = {}
+
+
+def _init_worker(shared_alpha, current_search):
+    _worker["alpha"] = shared_alpha
+    _worker["current"] = current_search
+    _worker["tt"] = TranspositionTable()
+    _worker["ordering"] = MoveOrdering()
+    _worker["search_id"] = None
+    _worker["namespace"] = None
+
+
+def get_pool(workers):
+    if workers not in _pools:
+        shared_alpha = mp.Value("d", float("-inf"))
+        current_search = mp.Value("q", 0, lock=False)
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(shared_alpha, current_search))
+        _pools[workers] = (pool, shared_alpha, current_search)
+    return _pools[workers]
+
+
+def shutdown_pools():
+    for pool, _, _ in _pools.values():
+        pool.shutdown(cancel_futures=True)
+    _pools.clear()
+
+
+# Positions go to the workers as the starting FEN plus the moves played,
+# so repetition draws are still seen there.
+def encode_position(board):
+    return board.root().fen(), [move.uci() for move in board.move_stack]
+
+
+def decode_position(fen, moves):
+    board = chess.Board(fen)
+    for uci in moves:
+        board.push_uci(uci)
+    return board
+
+
+# Tablebase of a worker process, opened once per (directory, max pieces)
+def worker_tablebase(settings):
+    if settings is None:
+        return None
+    if _worker.get("tablebase_settings") != settings:
+        from ai.tablebase import Tablebase
+        _worker["tablebase"] = Tablebase(*settings)
+        _worker["tablebase_settings"] = settings
+    return _worker["tablebase"]
+
+
+# Fill the worker's table from the search cache once per file. Workers only
+# read it, the main process writes the results back.
+def worker_warm_start(tt, path, ctx):
+    if path is None:
+        return
+    from ai.search_cache import SearchCache, cache_namespace
+    if _worker.get("cache_path") != path:
+        _worker["cache"] = SearchCache(path, read_only=True)
+        _worker["cache_path"] = path
+    _worker["cache"].warm(tt, cache_namespace(ctx))
+
+
+# ctx.stop of a worker's search: set as soon as the main process moves on
+# from root search `number` (finished, stopped or timed out), so tasks still
+# running end within a few nodes instead of at their deadline.
+class WorkerStop:
+
+    def __init__(self, current_search, number):
+        self.current_search = current_search
+        self.number = number
+
+    def is_set(self):
+        return self.current_search.value != self.number
+
+
+# Runs in a worker: search one root move.
+# With share_alpha the best score found so far by any worker is used as bound
+# and raised if this move beats it. Scores here are from the side to move at
+# the root (black's score, negated when white moves), so "higher is better"
+# for both colours. Returns (move, score, alpha used, stats counters), score
+# is None when the deadline passed or the search was stopped. search_number
+# tells the tasks of different root searches apart (see WorkerStop).
+def _search_root_move(fen, moves, move_uci, depth, options, search_id, search_number, share_alpha, deadline):
+    stop = WorkerStop(_worker["current"], search_number)
+    if stop.is_set():
+        return move_uci, None, float("-inf"), {}
+    board = decode_position(fen, moves)
+    move = chess.Move.from_uci(move_uci)
+
+    # Scores of other evaluation settings are no use here, start a new table
+    # when they change (same settings as the search cache's namespace)
+    namespace = (options.get("fast_eval", False), options.get("quiescence", False),
+                 options.get("pvs", False), options["tablebase"][1] if options.get("tablebase") else None)
+    if _worker["namespace"] != namespace:
+        _worker["namespace"] = namespace
+        _worker["tt"] = TranspositionTable()
+    tt = _worker["tt"]
+    if _worker["search_id"] != search_id:
+        _worker["search_id"] = search_id
+        tt.new_search()
+        _worker["ordering"].clear()
+
+    shared_alpha = _worker["alpha"]
+    alpha = shared_alpha.value if share_alpha else float("-inf")
+
+    inc = IncrementalEvaluator(board) if options.get("incremental", True) else None
+    ctx = SearchContext(tt, inc=inc, fast_eval=options.get("fast_eval", False),
+                        quiescence=options.get("quiescence", False),
+                        bitboard_eval=options.get("bitboard_eval", False),
+                        ordering=_worker["ordering"] if options.get("history_ordering", True) else None,
+                        pvs=options.get("pvs", False), tablebase=worker_tablebase(options.get("tablebase")))
+    ctx.deadline = deadline
+    ctx.stop = stop
+    worker_warm_start(tt, options.get("cache"), ctx)
+
+    is_maxing = board.turn == chess.BLACK
+    ctx.push(board, move)
+    try:
+        if ctx.pvs:
+            from ai.pvs import negamax
+            score = -negamax(board, depth - 1, float("-inf"), -alpha, ctx)[0]
+        elif is_maxing:
+            score = minimax(board, depth - 1, alpha, float("inf"), False, ctx)[0]
+        else:
+            score = -minimax(board, depth - 1, float("-inf"), -alpha, True, ctx)[0]
+    except SearchTimeout:
+        return move_uci, None, alpha, ctx.stats.counts()
+
+    if share_alpha and score > alpha:
+        with shared_alpha.get_lock():
+            # A task of an older search must not raise the bound of the next one
+            if not stop.is_set() and score > shared_alpha.value:
+                shared_alpha.value = score
+    return move_uci, score, alpha, ctx.stats.counts()
+
+
+# Root search with the root moves spread over a process pool.
+# Same result as search_root: a move only counts as best if its score is
+# exact, and a move searched against a raised alpha that ties the best score
+# is searched again with a full window so ties go to the earlier move, as in
+# the serial loop. With quiescence the move can still differ: delta pruning
+# makes quiescence scores depend on the window, and the workers search most
+# moves against other bounds than the serial loop does. The move picked is
+# then as good as the serial one up to that pruning error (see test.py).
+def parallel_search_root(board, depth, ctx, root_moves=None, workers=2):
+    key = position_key(board)
+    entry = ctx.tt.probe(key)
+    tt_move = entry[3] if entry is not None else None
+    if entry is not None and reusable(entry[0], depth) and entry[1] == EXACT and tt_move in board.legal_moves:
+        return entry[2], tt_move, {tt_move: entry[2]}
+
+    if root_moves is None:
+        root_moves = ctx.order_moves(board, tt_move, ctx.pv_moves.get(key))
+    if not root_moves:
+        return float("-inf"), None, {}
+
+    pool, shared_alpha, current_search = get_pool(workers)
+    with shared_alpha.get_lock():
+        current_search.value += 1
+        shared_alpha.value = float("-inf")
+    search_number = current_search.value
+    try:
+        return _parallel_search(board, key, depth, ctx, root_moves, pool, shared_alpha, search_number)
+    finally:
+        # Tasks of this search that are still running stop at once
+        with shared_alpha.get_lock():
+            current_search.value += 1
+
+
+# parallel_search_root once its root moves are known
+def _parallel_search(board, key, depth, ctx, root_moves, pool, shared_alpha, search_number):
+    fen, moves = encode_position(board)
+    options = {
+        "incremental": ctx.inc is not None,
+        "fast_eval": ctx.fast_eval,
+        "quiescence": ctx.quiescence,
+        "bitboard_eval": ctx.bitboard_eval,
+        "history_ordering": ctx.ordering is not None,
+        "pvs": ctx.pvs,
+        "tablebase": (ctx.tablebase.directory, ctx.tablebase.max_pieces) if ctx.tablebase is not None else None,
+        "cache": ctx.cache_path,
+    }
+    search_id = (key, depth, ctx.tt.generation)
+
+    # The first move is searched alone with a full window to get a real bound,
+    # the rest start together once it is in
+    futures = {pool.submit(_search_root_move, fen, moves, root_moves[0].uci(), depth, options,
+                           search_id, search_number, False, ctx.deadline): 0}
+    results = {}
+    started = 1
+    while futures:
+        done, _ = wait(futures, timeout=STOP_POLL if ctx.stop is not None else None, return_when=FIRST_COMPLETED)
+        if ctx.stop is not None and ctx.stop.is_set():
+            for pending in futures:
+                pending.cancel()
+            raise SearchTimeout()
+        for future in done:
+            index = futures.pop(future)
+            move_uci, score, alpha_used, counts = future.result()
+            ctx.stats.merge(counts)
+            if score is None:
+                for pending in futures:
+                    pending.cancel()
+                raise SearchTimeout()
+            results[index] = (score, alpha_used)
+            if index == 0:
+                shared_alpha.value = max(shared_alpha.value, score)
+
+        if started == 1 and 0 in results:
+            for index in range(1, len(root_moves)):
+                futures[pool.submit(_search_root_move, fen, moves, root_moves[index].uci(), depth,
+                                    options, search_id, search_number, True, ctx.deadline)] = index
+            started = len(root_moves)
+
+    sign = 1 if board.turn == chess.BLACK else -1
+    scores = {root_moves[index]: score * sign for index, (score, _) in results.items()}
+
+    exact = [(score, index) for index, (score, alpha_used) in results.items() if score > alpha_used]
+    bestEval = max(score for score, _ in exact)
+    bestIndex = min(index for score, index in exact if score == bestEval)
+
+    # Fail-low results can only tie the best, check those that come earlier
+    for index in range(bestIndex):
+        score, alpha_used = results[index]
+        if score <= alpha_used and score >= bestEval:
+            future = pool.submit(_search_root_move, fen, moves, root_moves[index].uci(), depth, options,
+                                 search_id, search_number, False, ctx.deadline)
+            _, score, _, counts = future.result()
+            ctx.stats.merge(counts)
+            if score is None:
+                raise SearchTimeout()
+            scores[root_moves[index]] = score * sign
+            if score >= bestEval:
+                bestIndex = index
+                break
+
+    finalMove = root_moves[bestIndex]
+    bestEval *= sign
+    ctx.tt.store(key, depth, EXACT, bestEval, finalMove)
+    return bestEval, finalMove, scores
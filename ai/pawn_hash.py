@@ -0,0 +1,130 @@
+import chess as ch
+from collections import OrderedDict
+
+# Pawn structure terms of evaluate_pawn_structure (doubled, isolated and
+# passed pawns, pawn chains), computed on the two pawn bitboards and cached
+# by them. This is the only place the pawn terms are computed.
+
+FILE_MASKS = ch.BB_FILES
+
+# Files next to each file
+ADJACENT_FILE_MASKS = [
+    (FILE_MASKS[f - 1] if f > 0 else 0) | (FILE_MASKS[f + 1] if f < 7 else 0)
+    for f in range(8)
+]
+
+
+# Squares that must be free of enemy pawns for a pawn to count as passed, per
+# color and square: same and adjacent files, on the ranks counted as "ahead"
+# (lower ranks for white, higher for black, as the evaluation always had it)
+def _passed_masks(color):
+    masks = []
+    for square in ch.SQUARES:
+        file_index = square % 8
+        rank_index = square // 8
+        ranks = range(rank_index - 1, -1, -1) if color == ch.WHITE else range(rank_index + 1, 8)
+        mask = 0
+        for r in ranks:
+            for f in range(max(0, file_index - 1), min(8, file_index + 2)):
+                mask |= ch.BB_SQUARES[r * 8 + f]
+        masks.append(mask)
+    return masks
+
+PASSED_MASKS = {ch.WHITE: _passed_masks(ch.WHITE), ch.BLACK: _passed_masks(ch.BLACK)}
+
+# Squares a friendly pawn protects this pawn from (pawn chains):
+# diagonally behind it, which is where an enemy pawn on it would attack
+CHAIN_MASKS = {ch.WHITE: ch.BB_PAWN_ATTACKS[ch.BLACK], ch.BLACK: ch.BB_PAWN_ATTACKS[ch.WHITE]}
+
+
+def doubled_pawns(pawns):
+    files = 0
+    for f in range(8):
+        if pawns & FILE_MASKS[f]:
+            files += 1
+    return ch.popcount(pawns) - files
+
+
+def isolated_pawns(pawns):
+    count = 0
+    for f in range(8):
+        on_file = pawns & FILE_MASKS[f]
+        if on_file and not pawns & ADJACENT_FILE_MASKS[f]:
+            count += ch.popcount(on_file)
+    return count
+
+
+def passed_pawns(pawns, enemy_pawns, color):
+    passed_count = 0
+    masks = PASSED_MASKS[color]
+    for pawn in ch.scan_forward(pawns):
+        if not enemy_pawns & masks[pawn]:
+            rank_index = pawn // 8
+            advance_bonus = rank_index if color == ch.BLACK else (7 - rank_index)
+            passed_count += 1 + (advance_bonus * 0.1)
+    return passed_count
+
+
+def pawn_chains(pawns, color):
+    chain_value = 0
+    masks = CHAIN_MASKS[color]
+    for pawn in ch.scan_forward(pawns):
+        chain_value += ch.popcount(pawns & masks[pawn])
+    return chain_value
+
+
+# evaluate_pawn_structure from the two pawn bitboards (same weights and order)
+def pawn_structure_score(white_pawns, black_pawns):
+    score = 0
+
+    score += doubled_pawns(white_pawns) * 0.5
+    score -= doubled_pawns(black_pawns) * 0.5
+
+    score += isolated_pawns(white_pawns) * 0.3
+    score -= isolated_pawns(black_pawns) * 0.3
+
+    score -= passed_pawns(white_pawns, black_pawns, ch.WHITE) * 0.6
+    score += passed_pawns(black_pawns, white_pawns, ch.BLACK) * 0.6
+
+    score -= pawn_chains(white_pawns, ch.WHITE) * 0.4
+    score += pawn_chains(black_pawns, ch.BLACK) * 0.4
+
+    return score
+
+
+# Bounded LRU cache of pawn structure scores keyed by the pawn bitboards.
+# Sibling nodes mostly share their pawns, so most leaves are one lookup.
+class PawnHashTable:
+
+    def __init__(self, max_entries=16384):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+    def score(self, board):
+        white_pawns = board.pawns & board.occupied_co[ch.WHITE]
+        black_pawns = board.pawns & board.occupied_co[ch.BLACK]
+        key = (white_pawns, black_pawns)
+
+        value = self.entries.get(key)
+        if value is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+
+        self.misses += 1
+        value = pawn_structure_score(white_pawns, black_pawns)
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return value
+
+# Shared by every evaluation in the process
+pawn_hash = PawnHashTable()
@@ -0,0 +1,104 @@
+import time
+from ai.minimax import transposition_table
+from ai.transposition import position_key
+
+# Pondering: think on the opponent's time. After the engine moves, the
+# opponent's expected reply (from the principal variation) is played on a
+# copy of the board and searched in the background. If the opponent plays
+# it, that search simply goes on and is usually done at once; otherwise it
+# is cancelled and the new search starts from a transposition table that
+# already holds its partial results (and a search cache, if used, too).
+
+# A ponder search has no clock of its own, it runs until the opponent moves
+PONDER_MAX_TIME = 600
+
+
+class Ponderer:
+
+    # search: the BackgroundSearch the engine moves with.
+    # max_time: seconds per move; after a correct guess the search gets what
+    # is left of it (the time already spent pondering counts), None to let
+    # it finish its max_depth.
+    def __init__(self, search, max_time=None):
+        self.search = search
+        self.max_time = max_time
+        self.guess = None
+        self.started = None
+        self.deadline = None
+        self.hits = 0
+        self.misses = 0
+
+    # The reply expected in `board` (opponent to move): the second move of
+    # the engine's principal variation, or the table's best move
+    def expected_reply(self, board, pv=()):
+        if len(pv) >= 2 and pv[1] in board.legal_moves:
+            return pv[1]
+        tt = self.search.search_options.get("tt") or transposition_table
+        entry = tt.probe(position_key(board))
+        if entry is not None and entry[3] is not None and board.is_legal(entry[3]):
+            return entry[3]
+        return None
+
+    # Start pondering after the engine's move. pv is the principal variation
+    # of the search that found it. Returns False if there is nothing to guess.
+    def start(self, board, pv=()):
+        self.guess = None
+        self.deadline = None
+        if board.is_game_over():
+            return False
+        guess = self.expected_reply(board, pv)
+        if guess is None:
+            return False
+
+        position = board.copy()
+        position.push(guess)
+        if position.is_game_over():
+            return False
+
+        self.search.start(position, max_time=PONDER_MAX_TIME)
+        self.guess = guess
+        self.started = time.monotonic()
+        return True
+
+    # The opponent played `move`. On a correct guess the ponder search goes
+    # on (collect it with poll() or wait()) and True is returned; otherwise
+    # it is cancelled and the caller searches the new position itself.
+    def opponent_moved(self, move):
+        self.deadline = None  # only a search after a correct guess has one
+        if self.guess is None:
+            return False
+
+        if move == self.guess:
+            self.hits += 1
+            self.guess = None
+            if self.max_time is not None:
+                left = self.max_time - (time.monotonic() - self.started)
+                self.deadline = time.monotonic() + max(0.0, left)
+            return True
+
+        self.misses += 1
+        self.stop()
+        return False
+
+    # (move, stats) once the search after a correct guess is done, or None.
+    # Stops it when the move's time is used up.
+    def poll(self):
+        result = self.search.poll()
+        if result is not None:
+            self.deadline = None
+        elif self.deadline is not None and time.monotonic() >= self.deadline:
+            self.search.force()
+            self.deadline = None
+        return result
+
+    def wait(self):
+        while True:
+            result = self.poll()
+            if result is not None:
+                return result
+            time.sleep(0.01)
+
+    def stop(self):
+        self.guess = None
+        self.deadline = None
+        self.search.cancel()
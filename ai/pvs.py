@@ -0,0 +1,213 @@
+import chess
+from ai.minimax import quiescence, path_draw, position_key, mateScore, drawScore
+from ai.transposition import reusable, EXACT, LOWER, UPPER
+
+# Negamax / principal variation search, used with find_best_move(pvs=True).
+# Scores inside are from the side to move's point of view; the evaluation
+# and the transposition table stay from black's side, as in minimax, so
+# both searches can share a table.
+
+NULL_WINDOW = 1e-4           # width of the zero windows (scores are floats)
+NULL_MOVE_REDUCTION = 2      # extra plies taken off the null move search
+NULL_MOVE_MIN_DEPTH = 3
+LMR_MIN_DEPTH = 3            # late move reductions from this depth
+LMR_REDUCTION = 2            # plies; even, so the leaves keep their side to move (initiative bonus)
+LMR_FULL_MOVES = 3           # moves searched at full depth before reducing
+ASPIRATION_WINDOW = 1.0      # first window around the expected root score
+ASPIRATION_GROWTH = 4
+
+
+# Black's score to the side to move's, and back (the same negation)
+def side_score(board, score):
+    return score if board.turn == chess.BLACK else -score
+
+
+# Bound of a side-to-move score as seen from black's side
+def black_bound(board, bound):
+    if board.turn == chess.BLACK or bound == EXACT:
+        return bound
+    return UPPER if bound == LOWER else LOWER
+
+
+# Null move is unsafe when the side to move has only pawns (zugzwang)
+def has_pieces(board, color):
+    return bool(board.occupied_co[color] & ~(board.pawns | board.kings))
+
+
+def negamax(board, depth, alpha, beta, ctx, allow_null=True):
+    if depth <= 0 and ctx.quiescence:
+        # quiescence() works on black's scores with a maximizing flag
+        if board.turn == chess.BLACK:
+            return quiescence(board, alpha, beta, True, ctx), None
+        return -quiescence(board, -beta, -alpha, False, ctx), None
+    depth = max(depth, 0)  # reductions may overshoot the horizon
+    ctx.count_node()
+    if path_draw(board):
+        return side_score(board, drawScore), None
+
+    key = None
+    tt_move = None
+    tt = ctx.tt
+    stats = ctx.stats
+    if tt is not None:
+        key = position_key(board)
+        entry = tt.probe(key)
+        stats.tt_probes += 1
+        if entry is not None:
+            stats.tt_hits += 1
+            entry_depth, bound, score, tt_move = entry
+            if reusable(entry_depth, depth):
+                score = side_score(board, score)
+                bound = black_bound(board, bound)
+                if bound == EXACT:
+                    stats.tt_cutoffs += 1
+                    return score, tt_move
+                elif bound == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    stats.tt_cutoffs += 1
+                    return score, tt_move
+
+    score = ctx.leaf_score(board, depth)
+    if score is not None:
+        if tt is not None:
+            tt.store(key, depth, EXACT, score, None)
+        return side_score(board, score), None
+
+    in_check = board.is_check()
+    # Zero windows come out a little wider than NULL_WINDOW for some alphas
+    # (float rounding), so compare against twice the width
+    is_pv = beta - alpha > 2 * NULL_WINDOW
+
+    # Null move pruning: if passing still fails high the position is good enough
+    if (allow_null and not is_pv and not in_check and depth >= NULL_MOVE_MIN_DEPTH
+            and beta < mateScore and has_pieces(board, board.turn)):
+        ctx.push(board, chess.Move.null())
+        score = -negamax(board, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + NULL_WINDOW, ctx, False)[0]
+        ctx.pop(board)
+        if score >= beta:
+            stats.null_cutoffs += 1
+            return score, None
+
+    alpha_orig = alpha
+    bestEval = float("-inf")
+    finalMove = None
+    pv_move = ctx.pv_moves.get(key) if key is not None else None
+
+    moves_sorted = ctx.node_moves(board, tt_move, pv_move)
+    for index, move in enumerate(moves_sorted):
+        quiet = not (move.promotion or board.is_capture(move))
+        ctx.push(board, move)
+
+        if index == 0:
+            score = -negamax(board, depth - 1, -beta, -alpha, ctx)[0]
+        else:
+            # Late quiet moves are searched shallower first
+            reduction = 0
+            if (quiet and depth >= LMR_MIN_DEPTH and index >= LMR_FULL_MOVES
+                    and not in_check and not board.is_check()):
+                reduction = LMR_REDUCTION
+            score = -negamax(board, depth - 1 - reduction, -alpha - NULL_WINDOW, -alpha, ctx)[0]
+            if reduction and score > alpha:
+                stats.researches += 1
+                score = -negamax(board, depth - 1, -alpha - NULL_WINDOW, -alpha, ctx)[0]
+            # Beat the best move so far: find out by how much
+            if alpha < score < beta:
+                stats.researches += 1
+                score = -negamax(board, depth - 1, -beta, -alpha, ctx)[0]
+
+        ctx.pop(board)
+
+        if score > bestEval:
+            bestEval = score
+            finalMove = move
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            ctx.cutoff(board, move, depth, index)
+            break
+
+    if tt is not None:
+        if bestEval <= alpha_orig:
+            bound = UPPER
+        elif bestEval >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        tt.store(key, depth, black_bound(board, bound), side_score(board, bestEval), finalMove)
+
+    return bestEval, finalMove
+
+
+# Root of the PVS search. Same result format as search_root: (best score,
+# best move, {move: score}) from black's side. Scores of moves after the
+# first are only bounds unless they became the best move.
+# From depth 3 the window is centred on the score two iterations back (same
+# side to move at the leaves, so the same initiative bonus) and widened
+# when the result falls outside it.
+def search_root_pvs(board, depth, ctx, root_moves=None):
+    key = position_key(board)
+    entry = ctx.tt.probe(key)
+    tt_move = None
+    if entry is not None:
+        tt_move = entry[3]
+        if reusable(entry[0], depth) and entry[1] == EXACT and tt_move in board.legal_moves:
+            return entry[2], tt_move, {tt_move: entry[2]}
+
+    if root_moves is None:
+        root_moves = ctx.order_moves(board, tt_move, ctx.pv_moves.get(key))
+    if not root_moves:
+        return float("-inf") if board.turn == chess.BLACK else float("inf"), None, {}
+
+    expected = ctx.iteration_scores.get(depth - 2)
+    if expected is None or abs(expected) >= mateScore:
+        return root_window(board, depth, ctx, root_moves, float("-inf"), float("inf"))
+
+    expected = side_score(board, expected)
+    window = ASPIRATION_WINDOW
+    alpha = expected - window
+    beta = expected + window
+    while True:
+        bestEval, bestMove, scores = root_window(board, depth, ctx, root_moves, alpha, beta)
+        score = side_score(board, bestEval)
+        if alpha < score < beta or (alpha == float("-inf") and beta == float("inf")):
+            return bestEval, bestMove, scores
+        ctx.stats.aspiration_fails += 1
+        window *= ASPIRATION_GROWTH
+        if score <= alpha:
+            alpha = score - window if window < mateScore else float("-inf")
+        else:
+            beta = score + window if window < mateScore else float("inf")
+
+
+def root_window(board, depth, ctx, root_moves, alpha, beta):
+    key = position_key(board)
+    alpha_orig = alpha
+    bestEval = float("-inf")
+    finalMove = None
+    scores = {}
+
+    for index, move in enumerate(root_moves):
+        ctx.push(board, move)
+        if index == 0:
+            score = -negamax(board, depth - 1, -beta, -alpha, ctx)[0]
+        else:
+            score = -negamax(board, depth - 1, -alpha - NULL_WINDOW, -alpha, ctx)[0]
+            if alpha < score < beta:
+                ctx.stats.researches += 1
+                score = -negamax(board, depth - 1, -beta, -alpha, ctx)[0]
+        ctx.pop(board)
+        scores[move] = side_score(board, score)
+
+        if score > bestEval:
+            bestEval = score
+            finalMove = move
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+
+    if finalMove is not None and alpha_orig < bestEval < beta:
+        ctx.tt.store(key, depth, EXACT, side_score(board, bestEval), finalMove)
+
+    return side_score(board, bestEval), finalMove, scores
@@ -0,0 +1,161 @@
+import os
+import time
+import sqlite3
+import weakref
+import chess as ch
+from ai.moves import unpack_move
+
+# Search results kept on disk between runs: (position hash, depth) ->
+# (bound, score, best move) in a SQLite file. A search warm-starts its
+# transposition table from the file and writes its own entries back, so
+# repeated analysis of the same positions (test positions, openings,
+# simulate.py games) doesn't start from an empty table every time.
+
+DEFAULT_CACHE = os.path.join("cache", "search_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 500000
+
+# Shallower entries are cheaper to search again than to store
+MIN_SAVE_DEPTH = 1
+
+# Keys are unsigned 64 bit, SQLite integers are signed
+KEY_OFFSET = 1 << 63
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    bound INTEGER NOT NULL,
+    score REAL NOT NULL,
+    move TEXT,
+    used REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+# A stored entry only replaces one at least as deep
+UPSERT = """
+INSERT INTO entries (namespace, key, depth, bound, score, move, used) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (namespace, key) DO UPDATE SET
+    depth = excluded.depth, bound = excluded.bound, score = excluded.score,
+    move = COALESCE(excluded.move, entries.move), used = excluded.used
+WHERE excluded.depth >= entries.depth
+"""
+
+
+# Scores depend on how leaves are evaluated, entries of differently
+# configured searches are kept apart. With a tablebase its piece limit
+# counts too: it decides which positions are scored from the tables.
+def cache_namespace(ctx):
+    tablebase = ctx.tablebase.max_pieces if ctx.tablebase is not None else None
+    return (f"fast={int(ctx.fast_eval)},quiescence={int(ctx.quiescence)},"
+            f"pvs={int(ctx.pvs)},tablebase={tablebase}")
+
+
+class SearchCache:
+
+    def __init__(self, path=DEFAULT_CACHE, max_entries=DEFAULT_MAX_ENTRIES,
+                 min_depth=MIN_SAVE_DEPTH, read_only=False):
+        self.path = path
+        self.max_entries = max_entries
+        self.min_depth = min_depth
+        self.read_only = read_only
+        self.connection = None
+        self.pid = None
+        self.warmed = weakref.WeakKeyDictionary()  # table -> namespaces loaded into it
+        self.loaded = 0
+        self.saved = 0
+
+    # Connections can't cross a fork, each process opens its own
+    def connect(self):
+        if self.connection is None or self.pid != os.getpid():
+            if self.read_only:
+                if not os.path.exists(self.path):
+                    return None
+                self.connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30)
+            else:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self.connection = sqlite3.connect(self.path, timeout=30)
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.execute(SCHEMA)
+                self.connection.commit()
+            self.pid = os.getpid()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None and self.pid == os.getpid():
+            self.connection.close()
+        self.connection = None
+
+    def __len__(self):
+        connection = self.connect()
+        if connection is None:
+            return 0
+        return connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # Copy the most recently used entries into `tt` (at most its size).
+    # Returns the number of entries loaded.
+    def load(self, tt, namespace, limit=None):
+        connection = self.connect()
+        if connection is None:
+            return 0
+        if limit is None:
+            limit = tt.size
+        try:
+            rows = connection.execute(
+                "SELECT key, depth, bound, score, move FROM entries WHERE namespace = ? "
+                "ORDER BY used DESC, depth DESC LIMIT ?", (namespace, limit)).fetchall()
+        except sqlite3.OperationalError:
+            return 0  # no table yet (read-only open of a fresh file)
+
+        # Oldest first, so newer entries win slots they share with older ones
+        for key, depth, bound, score, move in reversed(rows):
+            tt.store(key + KEY_OFFSET, depth, bound, score, ch.Move.from_uci(move) if move else None)
+        self.loaded += len(rows)
+        return len(rows)
+
+    # Load once per table, later searches with the same table already have it
+    def warm(self, tt, namespace):
+        namespaces = self.warmed.setdefault(tt, set())
+        if namespace in namespaces:
+            return 0
+        namespaces.add(namespace)
+        return self.load(tt, namespace)
+
+    # Write the entries of the table's current search that are deep enough.
+    # Returns the number of entries written.
+    def save(self, tt, namespace):
+        if self.read_only:
+            return 0
+        now = time.time()
+        rows = [(namespace, slot[0] - KEY_OFFSET, slot[1], slot[2], slot[3],
+                 unpack_move(slot[4]).uci() if slot[4] is not None else None, now)
+                for slot in tt.slots
+                if slot is not None and slot[5] == tt.generation and slot[1] >= self.min_depth
+                and abs(slot[3]) != float("inf")]
+        if not rows:
+            return 0
+
+        connection = self.connect()
+        with connection:
+            connection.executemany(UPSERT, rows)
+            self.trim(connection)
+        self.saved += len(rows)
+        return len(rows)
+
+    # Keep the file bounded: drop the least recently used entries
+    def trim(self, connection):
+        count = connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count > self.max_entries:
+            connection.execute(
+                "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY used ASC, depth ASC LIMIT ?)",
+                (count - self.max_entries,))
+
+    def clear(self):
+        connection = self.connect()
+        if connection is not None and not self.read_only:
+            with connection:
+                connection.execute("DELETE FROM entries")
+        self.warmed.clear()
@@ -0,0 +1,104 @@
+import time
+
+# Counters that add up across searches (and across parallel workers)
+COUNTERS = ("nodes", "qnodes", "leaf_evals", "beta_cutoffs", "first_move_cutoffs",
+            "tt_probes", "tt_hits", "tt_cutoffs", "null_cutoffs", "researches", "aspiration_fails", "tb_hits")
+
+
+# Numbers collected while searching.
+# Pass one to find_best_move(stats=...) to read them after the search, or a
+# callback(stats) that is called after every finished iteration.
+class SearchStats:
+
+    def __init__(self):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.iterations = []  # (depth, seconds, nodes) per finished iteration
+        self.depth = 0
+        self.score = None
+        self.best_move = None
+        self.pv = []
+        self.book = False  # move came from the opening book, nothing was searched
+        self.tablebase = False  # move came from the endgame tablebase
+        self.start_time = time.monotonic()
+        self.elapsed = 0.0
+
+    def start(self):
+        self.start_time = time.monotonic()
+
+    # Record a finished iteration (or the only one of a fixed-depth search)
+    def finish_iteration(self, depth, score, best_move, pv=None):
+        now = time.monotonic()
+        self.elapsed = now - self.start_time
+        done = sum(nodes for _, _, nodes in self.iterations)
+        spent = sum(seconds for _, seconds, _ in self.iterations)
+        self.iterations.append((depth, self.elapsed - spent, self.nodes - done))
+        self.depth = depth
+        self.score = score
+        self.best_move = best_move
+        self.pv = pv or ([best_move] if best_move else [])
+
+    # Search is over: count the time of an unfinished last iteration too
+    def stop(self):
+        self.elapsed = time.monotonic() - self.start_time
+
+    # Beta cutoff after trying `index` moves (0 = the first one)
+    def count_cutoff(self, index):
+        self.beta_cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+    # Add counters from a worker process or another search
+    def merge(self, counts):
+        if isinstance(counts, SearchStats):
+            counts = counts.counts()
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + counts.get(name, 0))
+
+    def counts(self):
+        return {name: getattr(self, name) for name in COUNTERS}
+
+    def nps(self):
+        elapsed = self.elapsed or (time.monotonic() - self.start_time)
+        return self.nodes / elapsed if elapsed > 0 else 0.0
+
+    # Share of beta cutoffs produced by the first move tried
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    # Effective branching factor: growth between the last two iterations,
+    # or nodes ** (1 / depth) after a single fixed-depth search
+    def branching_factor(self):
+        if len(self.iterations) >= 2 and self.iterations[-2][2] > 0:
+            return self.iterations[-1][2] / self.iterations[-2][2]
+        if self.depth > 0 and self.nodes > 0:
+            return self.nodes ** (1 / self.depth)
+        return 0.0
+
+    def as_dict(self):
+        info = self.counts()
+        info.update({
+            "depth": self.depth,
+            "time_sec": round(self.elapsed, 3),
+            "nps": round(self.nps()),
+            "first_move_cutoff_rate": round(self.first_move_cutoff_rate(), 3),
+            "tt_hit_rate": round(self.tt_hit_rate(), 3),
+            "branching_factor": round(self.branching_factor(), 2),
+            "book": self.book,
+            "tablebase": self.tablebase,
+        })
+        return info
+
+    def __str__(self):
+        if self.book:
+            return "book move"
+        if self.tablebase:
+            return "tablebase move"
+        return (f"depth {self.depth}, nodes {self.nodes} ({self.qnodes} quiescence), "
+                f"{self.nps():.0f} nps, evals {self.leaf_evals}, "
+                f"cutoffs {self.beta_cutoffs} ({self.first_move_cutoff_rate():.0%} first move), "
+                f"tt hits {self.tt_hits}/{self.tt_probes}, ebf {self.branching_factor():.2f}, "
+                f"time {self.elapsed:.2f}s")
@@ -0,0 +1,122 @@
+import chess as ch
+import chess.syzygy
+from collections import OrderedDict
+from ai.evaluation import drawScore
+from ai.transposition import position_key
+
+# Syzygy endgame tablebase probing (python-chess reads the .rtbw/.rtbz files,
+# which have to be downloaded into a local directory beforehand).
+# Positions with at most `max_pieces` pieces are looked up instead of searched.
+
+DEFAULT_MAX_PIECES = 5
+
+# Score of a tablebase win: above any evaluation, below a mate found by the
+# search (mateScore) so real mates are still preferred
+TB_WIN_SCORE = 20
+
+
+class Tablebase:
+
+    def __init__(self, directory, max_pieces=DEFAULT_MAX_PIECES, cache_size=65536):
+        self.directory = directory
+        self.max_pieces = max_pieces
+        self.cache_size = cache_size
+        self.tables = None
+        self.wdl_cache = OrderedDict()
+        self.dtz_cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def open(self):
+        if self.tables is None:
+            self.tables = chess.syzygy.open_tablebase(self.directory)
+        return self.tables
+
+    def close(self):
+        if self.tables is not None:
+            self.tables.close()
+            self.tables = None
+
+    # Small enough to be in the tables (castling rights are not covered)
+    def covers(self, board):
+        return ch.popcount(board.occupied) <= self.max_pieces and not board.castling_rights
+
+    def cached_probe(self, cache, probe, board):
+        key = position_key(board)
+        if key in cache:
+            self.hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+
+        self.misses += 1
+        value = probe(board)
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    # Win/draw/loss for the side to move (2 win, 1 win spoiled by the fifty
+    # move rule, 0 draw, -1, -2 loss), None if the table is missing
+    def probe_wdl(self, board):
+        if not self.covers(board):
+            return None
+        return self.cached_probe(self.wdl_cache, self.open().get_wdl, board)
+
+    # Distance to the next capture or pawn move, signed like probe_wdl
+    def probe_dtz(self, board):
+        if not self.covers(board):
+            return None
+        return self.cached_probe(self.dtz_cache, self.open().get_dtz, board)
+
+    # Search score (black's side) of a position in the tables, None if it
+    # isn't or the game is already over (evaluate() scores those)
+    def score(self, board):
+        if not self.covers(board) or board.is_game_over():
+            return None
+        wdl = self.probe_wdl(board)
+        if wdl is None:
+            return None
+        if wdl == 2:
+            score = TB_WIN_SCORE
+        elif wdl == -2:
+            score = -TB_WIN_SCORE
+        else:
+            return drawScore
+        return score if board.turn == ch.BLACK else -score
+
+    # Best root move by the tables: mates first, then the best result, winning
+    # with the shortest distance to zeroing, losing with the longest.
+    # None if the position or one of its successors isn't in the tables.
+    def best_move(self, board):
+        if not self.covers(board) or board.is_game_over():
+            return None
+
+        best = None
+        best_key = None
+        for move in board.legal_moves:
+            zeroing = board.is_zeroing(move)
+            board.push(move)
+            if board.is_checkmate():
+                board.pop()
+                return move
+            if board.is_game_over():
+                wdl, dtz = 0, 0
+            else:
+                wdl = self.probe_wdl(board)
+                dtz = self.probe_dtz(board)
+            board.pop()
+            if wdl is None or dtz is None:
+                return None
+
+            wdl = -wdl  # for the side that moved
+            if wdl > 0:
+                key = (wdl, zeroing, dtz)   # opponent's dtz is negative, closer to 0 is faster
+            elif wdl < 0:
+                key = (wdl, False, dtz)     # opponent's dtz is positive, longer is better
+            else:
+                key = (wdl, False, 0)
+            if best_key is None or key > best_key:
+                best = move
+                best_key = key
+
+        return best
@@ -0,0 +1,84 @@
+import chess.polyglot
+from ai.moves import pack_move, unpack_move
+
+# Bound types stored with each entry
+EXACT = 0
+LOWER = 1  # search failed high, real score is >= stored score
+UPPER = 2  # search failed low, real score is <= stored score
+
+# Rough size of one stored entry in bytes: list slot (8), 6-tuple (88),
+# 64 bit key (36), float score (24) and packed move int (28); depth, bound
+# and generation are small cached ints
+ENTRY_BYTES = 184
+
+REPLACEMENT_POLICIES = ("depth", "always")
+
+
+# Whether a stored score can stand in for a search to `depth`: it has to go
+# at least as deep and end on the same side to move. Every leaf evaluation
+# includes the initiative bonus of the side to move there, so scores of the
+# other depth parity are off by twice the bonus.
+def reusable(entry_depth, depth):
+    return entry_depth >= depth and (entry_depth - depth) % 2 == 0
+
+
+# Zobrist (polyglot) hash of a position, used as the table key
+def position_key(board):
+    return chess.polyglot.zobrist_hash(board)
+
+
+# Fixed size hash table of searched positions.
+# Each slot holds (key, depth, bound, score, best_move, generation), the move
+# packed into an int (ai/moves.py) so entries hold no Move objects.
+# replacement="depth" keeps the deeper entry unless it is from an older search,
+# replacement="always" overwrites the slot every time.
+class TranspositionTable:
+
+    def __init__(self, max_entries=None, size_mb=16, replacement="depth"):
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"unknown replacement policy: {replacement}")
+
+        if max_entries is None:
+            max_entries = (size_mb * 1024 * 1024) // ENTRY_BYTES
+
+        self.size = max(1, int(max_entries))
+        self.replacement = replacement
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.used = 0
+
+    def __len__(self):
+        return self.used
+
+    # Call once per root search so entries from older searches can be replaced
+    def new_search(self):
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.used = 0
+
+    # Returns (depth, bound, score, best_move) or None
+    def probe(self, key):
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry[1], entry[2], entry[3], unpack_move(entry[4])
+        return None
+
+    def store(self, key, depth, bound, score, best_move):
+        index = key % self.size
+        old = self.slots[index]
+
+        if old is None:
+            self.used += 1
+        elif self.replacement == "depth" and old[0] != key:
+            # Keep a deeper entry from the current search
+            if old[5] == self.generation and old[1] > depth:
+                return
+        if best_move is not None:
+            best_move = pack_move(best_move)
+        elif old is not None and old[0] == key:
+            # Don't lose the move we already know for this position
+            best_move = old[4]
+
+        self.slots[index] = (key, depth, bound, score, best_move, self.generation)
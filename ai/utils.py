@@ -1,4 +1,5 @@
 import chess as ch
+from ai.moves import gives_check
 
 def sort_moves(board, moves, is_maxing):
     moves = list(moves)
@@ -15,11 +16,25 @@ def move_score(board, move):
             # Higher value for bigger captures
             score += piece_value(captured_piece.piece_type)
 
-    if board.gives_check(move):
+    if gives_check(board, move):
         score += 1  # Small bonus for giving check
 
     return score
 
+# Most valuable victim / least valuable attacker score for captures
+def mvv_lva_score(board, move):
+    if board.is_en_passant(move):
+        victim = ch.PAWN
+    else:
+        victim = board.piece_type_at(move.to_square)
+
+    score = 0
+    if victim:
+        score += piece_value(victim) * 10 - piece_value(board.piece_type_at(move.from_square))
+    if move.promotion:
+        score += piece_value(move.promotion) * 10
+    return score
+
 def piece_value(piece_type):
     if piece_type == ch.PAWN:
         return 1
@@ -31,74 +46,6 @@ def piece_value(piece_type):
         return 9
     return 0
 
-# Count pawns in same col
-def count_doubled_pawns(pawns):
-    files = [0] * 8
-    for pawn in pawns:
-        file_index = pawn % 8
-        files[file_index] += 1
-
-    doubled_count = sum(max(0, count - 1) for count in files)
-    return doubled_count
-
-
-# count pawns with no pawn next to them
-def count_isolated_pawns(pawns):
-    files = [0] * 8
-    for pawn in pawns:
-        file_index = pawn % 8
-        files[file_index] += 1
-
-    isolated_count = 0
-    for i in range(8):
-        if files[i] > 0:
-            # Check if there are pawns on adjacent files
-            has_neighbor = False
-            if i > 0 and files[i-1] > 0:
-                has_neighbor = True
-            if i < 7 and files[i+1] > 0:
-                has_neighbor = True
-
-            if not has_neighbor:
-                isolated_count += files[i]
-
-    return isolated_count
-
-# cound passed pawns
-def count_passed_pawns(board, pawns, color):
-    passed_count = 0
-    enemy_color = not color
-    enemy_pawns = list(board.pieces(ch.PAWN, enemy_color))
-
-    for pawn in pawns:
-        file_index = pawn % 8
-        rank_index = pawn // 8
-
-        is_passed = True
-
-        # Direction of "ahead" depends on color
-        ahead_ranks = range(rank_index - 1, -1, -1) if color == ch.WHITE else range(rank_index + 1, 8)
-
-        # Check files: same file and adjacent files
-        check_files = [f for f in range(max(0, file_index - 1), min(8, file_index + 2))]
-
-        # Check for enemy pawns ahead on these files
-        for r in ahead_ranks:
-            for f in check_files:
-                square = r * 8 + f
-                if any(ep == square for ep in enemy_pawns):
-                    is_passed = False
-                    break
-            if not is_passed:
-                break
-
-        if is_passed:
-            # Value increases as pawn advances
-            advance_bonus = rank_index if color == ch.BLACK else (7 - rank_index)
-            passed_count += 1 + (advance_bonus * 0.1)
-
-    return passed_count
-
 # Check if a side can deliver checkmate in one move
 def can_checkmate_in_one(board, color):
     original_turn = board.turn
@@ -106,7 +53,7 @@ def can_checkmate_in_one(board, color):
     
     # Only check a limited number of moves for performance
     for move in list(board.legal_moves)[:15]:  # Check first 15 moves
-        if board.gives_check(move):
+        if gives_check(board, move):
             board.push(move)
             is_mate = board.is_checkmate()
             board.pop()
@@ -116,3 +63,60 @@ def can_checkmate_in_one(board, color):
     
     board.turn = original_turn
     return False
+
+# Pseudo-legal move count from attack bitboards (no legality check)
+def pseudo_mobility(board, color):
+    own = board.occupied_co[color]
+    enemy = board.occupied_co[not color]
+    count = 0
+
+    for square in ch.scan_forward(own & ~board.pawns):
+        count += ch.popcount(board.attacks_mask(square) & ~own)
+
+    pawns = board.pawns & own
+    if color == ch.WHITE:
+        pushes = ch.shift_up(pawns) & ~board.occupied
+        double_pushes = ch.shift_up(pushes & ch.BB_RANK_3) & ~board.occupied
+        captures = (ch.shift_up_left(pawns) | ch.shift_up_right(pawns)) & enemy
+    else:
+        pushes = ch.shift_down(pawns) & ~board.occupied
+        double_pushes = ch.shift_down(pushes & ch.BB_RANK_6) & ~board.occupied
+        captures = (ch.shift_down_left(pawns) | ch.shift_down_right(pawns)) & enemy
+
+    return count + ch.popcount(pushes) + ch.popcount(double_pushes) + ch.popcount(captures)
+
+# Count (pseudo-legal) moves of `color` that land on a square checking the enemy king
+def count_check_threats(board, color):
+    king_square = board.king(not color)
+    if king_square is None:
+        return 0
+
+    own = board.occupied_co[color]
+    occupied = board.occupied
+
+    # Squares a piece of each kind would give check from
+    diagonal = ch.BB_DIAG_ATTACKS[king_square][ch.BB_DIAG_MASKS[king_square] & occupied]
+    straight = (ch.BB_RANK_ATTACKS[king_square][ch.BB_RANK_MASKS[king_square] & occupied] |
+                ch.BB_FILE_ATTACKS[king_square][ch.BB_FILE_MASKS[king_square] & occupied])
+    check_squares = {
+        ch.KNIGHT: ch.BB_KNIGHT_ATTACKS[king_square],
+        ch.BISHOP: diagonal,
+        ch.ROOK: straight,
+        ch.QUEEN: diagonal | straight,
+    }
+
+    count = 0
+    for piece_type, checks in check_squares.items():
+        for square in ch.scan_forward(board.pieces_mask(piece_type, color)):
+            count += ch.popcount(board.attacks_mask(square) & ~own & checks)
+
+    # Pawns: pushes and captures onto squares attacking the king
+    pawns = board.pawns & own
+    pawn_checks = ch.BB_PAWN_ATTACKS[not color][king_square]
+    if color == ch.WHITE:
+        targets = (ch.shift_up(pawns) & ~occupied) | ((ch.shift_up_left(pawns) | ch.shift_up_right(pawns)) & board.occupied_co[not color])
+    else:
+        targets = (ch.shift_down(pawns) & ~occupied) | ((ch.shift_down_left(pawns) | ch.shift_down_right(pawns)) & board.occupied_co[not color])
+    count += ch.popcount(targets & pawn_checks)
+
+    return count
@@ -0,0 +1,295 @@
+import chess
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import sys
+from ai.minimax import find_best_move
+from ai.transposition import TranspositionTable
+from ai.stats import SearchStats
+from positions import BENCHMARK_POSITIONS
+from engine import parse_options
+from ai.eval_profile import leaf_positions, profile_terms, format_terms, profile_evaluate
+
+# A position is flagged when it gets this much slower than the baseline
+DEFAULT_THRESHOLD = 0.10
+# ... and by at least this many seconds: positions that take milliseconds
+# vary by more than the threshold between runs on their own
+DEFAULT_MIN_DELTA = 0.02
+
+# Entry points timed by --startup
+STARTUP_MODULES = ("ai.minimax", "engine", "uci", "cmdln", "server", "simulate", "test_performance")
+
+
+def run_position(fen, depth, options):
+    """
+    One search from a fresh board and an empty transposition table,
+    so every run does exactly the same work.
+    """
+    board = chess.Board(fen)
+    stats = SearchStats()
+    start = time.perf_counter()
+    move = find_best_move(board, depth, tt=TranspositionTable(), stats=stats, **options)
+    elapsed = time.perf_counter() - start
+    return move, stats, elapsed
+
+
+def run_benchmark(depth=3, repeat=3, warmup=1, options=None, positions=None, verbose=True):
+    """
+    Search every position `warmup` times without recording, then `repeat`
+    times, keeping the node count, chosen move and timings.
+    """
+    options = options or {}
+    positions = positions or BENCHMARK_POSITIONS
+    results = []
+
+    for name, fen in positions:
+        if chess.Board(fen).is_game_over():
+            continue
+
+        for _ in range(warmup):
+            run_position(fen, depth, options)
+
+        times = []
+        for _ in range(repeat):
+            move, stats, elapsed = run_position(fen, depth, options)
+            times.append(elapsed)
+
+        median = statistics.median(times)
+        row = {
+            "name": name,
+            "fen": fen,
+            "move": move.uci() if move else None,
+            "nodes": stats.nodes,
+            "leaf_evals": stats.leaf_evals,
+            "beta_cutoffs": stats.beta_cutoffs,
+            "time_median": round(median, 4),
+            "time_min": round(min(times), 4),
+            "nps": round(stats.nodes / median) if median > 0 else 0,
+        }
+        results.append(row)
+
+        if verbose:
+            print(f"{name:<28} {row['move'] or '-':<6} {row['nodes']:>9} nodes "
+                  f"{row['time_median']:>8.3f}s {row['nps']:>8} nps")
+
+    total_nodes = sum(row["nodes"] for row in results)
+    total_time = sum(row["time_median"] for row in results)
+    return {
+        "meta": {
+            "depth": depth,
+            "repeat": repeat,
+            "warmup": warmup,
+            "options": options,
+            "python": platform.python_version(),
+            "chess": chess.__version__,
+            "machine": platform.machine(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "positions": results,
+        "totals": {
+            "nodes": total_nodes,
+            "time": round(total_time, 4),
+            "nps": round(total_nodes / total_time) if total_time > 0 else 0,
+        },
+    }
+
+
+def run_batch(boards, fast=False):
+    """
+    Time evaluate_batch (ai/batch_eval.py, needs numpy) against calling
+    evaluate / evaluate_fast once per board, and check they agree.
+    """
+    try:
+        from ai.batch_eval import evaluate_batch, static_terms_batch, encode_boards
+    except ImportError:
+        raise RuntimeError("numpy is not installed (pip install numpy)")
+    from ai.evaluation import evaluate, evaluate_fast
+
+    scalar = evaluate_fast if fast else evaluate
+    start = time.perf_counter()
+    expected = [scalar(board) for board in boards]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = evaluate_batch(boards, fast)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    static_terms_batch(encode_boards(boards))
+    static_time = time.perf_counter() - start
+
+    return {
+        "positions": len(boards),
+        "scalar_sec": round(scalar_time, 4),
+        "batch_sec": round(batch_time, 4),
+        "static_terms_sec": round(static_time, 4),
+        "max_difference": max(abs(a - b) for a, b in zip(expected, scores)),
+    }
+
+
+def import_time(module):
+    """
+    Microseconds a fresh interpreter spends importing `module` (with
+    everything it pulls in) and python-chess within that, from python -X importtime.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times.get(module, 0), times.get("chess", 0)
+
+
+def run_startup(modules=STARTUP_MODULES, repeat=5):
+    """
+    Import cost of each entry point: median over `repeat` fresh interpreters
+    of python -X importtime, and the wall time of the whole process.
+    """
+    results = []
+    for module in modules:
+        imports = []
+        chess_imports = []
+        walls = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            module_us, chess_us = import_time(module)
+            walls.append(time.perf_counter() - start)
+            imports.append(module_us)
+            chess_imports.append(chess_us)
+        results.append({
+            "module": module,
+            "import_ms": round(statistics.median(imports) / 1000, 1),
+            "chess_ms": round(statistics.median(chess_imports) / 1000, 1),
+            "process_ms": round(statistics.median(walls) * 1000, 1),
+        })
+    return results
+
+
+def slower(old_time, new_time, threshold, min_delta):
+    """Whether new_time is a slowdown beyond both the relative and the absolute limit."""
+    return old_time > 0 and new_time > old_time * (1 + threshold) and new_time - old_time >= min_delta
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA):
+    """
+    Compare a report with a stored baseline.
+    Returns a list of (name, message) for every regression: a position that
+    got slower (by more than threshold and at least min_delta seconds, on
+    the median of the runs) or searched more nodes than threshold allows.
+    Changed moves are listed too since they usually mean the search itself
+    changed.
+    """
+    regressions = []
+    old_rows = {row["name"]: row for row in baseline["positions"]}
+
+    for row in report["positions"]:
+        old = old_rows.get(row["name"])
+        if old is None:
+            continue
+        if slower(old["time_median"], row["time_median"], threshold, min_delta):
+            change = row["time_median"] / old["time_median"] - 1
+            regressions.append((row["name"], f"time {old['time_median']:.3f}s -> {row['time_median']:.3f}s (+{change:.0%})"))
+        if old["nodes"] > 0 and row["nodes"] > old["nodes"] * (1 + threshold):
+            change = row["nodes"] / old["nodes"] - 1
+            regressions.append((row["name"], f"nodes {old['nodes']} -> {row['nodes']} (+{change:.0%})"))
+        if row["move"] != old["move"]:
+            regressions.append((row["name"], f"move {old['move']} -> {row['move']}"))
+
+    old_time = baseline["totals"]["time"]
+    new_time = report["totals"]["time"]
+    if slower(old_time, new_time, threshold, min_delta):
+        regressions.append(("TOTAL", f"time {old_time:.3f}s -> {new_time:.3f}s (+{new_time / old_time - 1:.0%})"))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search benchmark over a fixed position suite.")
+    parser.add_argument('--depth', type=int, default=3, help="Search depth")
+    parser.add_argument('--repeat', type=int, default=3, help="Recorded runs per position")
+    parser.add_argument('--warmup', type=int, default=1, help="Unrecorded runs per position")
+    parser.add_argument('--option', action='append', default=[],
+                        help="find_best_move option as key=value (e.g. quiescence=true), repeatable")
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file")
+    parser.add_argument('--compare', default=None, help="Baseline JSON to check for regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before a position is flagged (0.10 = 10%%)")
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA,
+                        help="Seconds a position must slow down by before it is flagged")
+    parser.add_argument('--eval-terms', action='store_true',
+                        help="Time each evaluation term over the suite (and its child positions) instead of searching")
+    parser.add_argument('--profiler', choices=["cprofile", "pyinstrument"], default=None,
+                        help="With --eval-terms: also profile evaluate() with this profiler")
+    parser.add_argument('--batch', action='store_true',
+                        help="Time evaluate_batch (numpy) against evaluate over the suite and its child positions")
+    parser.add_argument('--fast', action='store_true', help="With --profiler or --batch: use evaluate_fast instead")
+    parser.add_argument('--startup', action='store_true',
+                        help="Time importing each entry point in fresh interpreters (python -X importtime)")
+    args = parser.parse_args()
+
+    if args.startup:
+        rows = run_startup(repeat=args.repeat)
+        print(f"{'module':<18}{'import ms':>10}{'(chess)':>10}{'process ms':>12}")
+        for row in rows:
+            print(f"{row['module']:<18}{row['import_ms']:>10.1f}{row['chess_ms']:>10.1f}{row['process_ms']:>12.1f}")
+        if args.output:
+            with open(args.output, "w") as out:
+                json.dump({"python": platform.python_version(), "startup": rows}, out, indent=2)
+            print(f"Results saved to {args.output}")
+        return
+
+    if args.batch:
+        boards = leaf_positions(fen for _, fen in BENCHMARK_POSITIONS)
+        if args.fast:
+            boards = [board for board in boards if not board.is_game_over()]
+        result = run_batch(boards, args.fast)
+        print(f"{result['positions']} positions: one by one {result['scalar_sec']:.3f}s, "
+              f"evaluate_batch {result['batch_sec']:.3f}s "
+              f"(static terms {result['static_terms_sec']:.3f}s), "
+              f"max difference {result['max_difference']:.1e}")
+        return
+
+    if args.eval_terms:
+        boards = leaf_positions(fen for _, fen in BENCHMARK_POSITIONS)
+        boards = [board for board in boards if not board.is_game_over()]
+        print(f"Evaluation terms over {len(boards)} positions x {args.repeat}\n")
+        rows = profile_terms(boards, args.repeat)
+        print(format_terms(rows))
+        if args.output:
+            with open(args.output, "w") as out:
+                json.dump({"positions": len(boards), "repeat": args.repeat, "terms": rows}, out, indent=2)
+            print(f"Results saved to {args.output}")
+        if args.profiler:
+            print()
+            print(profile_evaluate(boards, args.profiler, args.repeat, args.fast))
+        return
+
+    report = run_benchmark(args.depth, args.repeat, args.warmup, parse_options(args.option))
+    totals = report["totals"]
+    print(f"\nTotal: {totals['nodes']} nodes in {totals['time']:.3f}s ({totals['nps']} nps)")
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(report, out, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as base:
+            baseline = json.load(base)
+        regressions = compare(report, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for name, message in regressions:
+                print(f"  {name}: {message}")
+            raise SystemExit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+if __name__ == "__main__":
+    main()
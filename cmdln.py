@@ -1,16 +1,30 @@
 import chess as ch
 from ai.minimax import find_best_move
-import argparse
+from ai.stats import SearchStats
 
 class CommandLineChess:
 
     #  initialize the command line chess game.
     #Can start with a custom board state for testing purposes.
-    def __init__(self, initial_board=None, depth=3):
+    #max_time limits the AI to that many seconds per move (depth becomes the max depth).
+    #search_options are passed on to find_best_move (e.g. fast_eval=True,
+    #book=OpeningBook() to answer from the opening book without searching, or
+    #cache=SearchCache() to reuse the results of earlier sessions).
+    #ponder=True lets the AI search the expected reply while the human thinks.
+    def __init__(self, initial_board=None, depth=3, max_time=None, ponder=False, **search_options):
         self.board = ch.Board(initial_board) if initial_board else ch.Board()
         self.move_history = []
         self.game_over = False
         self.depth = depth
+        self.max_time = max_time
+        self.search_options = search_options
+        self.ponderer = None
+        self.ponder_hit = False
+        if ponder:
+            from ai.background import BackgroundSearch
+            from ai.ponder import Ponderer
+            search = BackgroundSearch(max_depth=depth, max_time=max_time, **search_options)
+            self.ponderer = Ponderer(search, max_time)
 
     def print_board(self):
         #Print the current board state in a readable format.
@@ -72,6 +86,8 @@ class CommandLineChess:
 
                 self.board.push(move)
                 self.move_history.append(move_uci)
+                if self.ponderer is not None:
+                    self.ponder_hit = self.ponderer.opponent_moved(move)
                 return True
             return False
         except:
@@ -80,7 +96,17 @@ class CommandLineChess:
     # Process the AI move using the same minimax algorithm as the GUI version.
     def process_ai_move(self):
         print("\nAI is thinking...")
-        ai_move = find_best_move(self.board, self.depth)
+        if self.ponder_hit:
+            # Already searching this position since the AI's last move
+            print("(expected move, pondering continues)")
+            ai_move, stats = self.ponderer.wait()
+            self.ponder_hit = False
+        elif self.ponderer is not None:
+            self.ponderer.search.start(self.board)
+            ai_move, stats = self.ponderer.wait()
+        else:
+            stats = SearchStats()
+            ai_move = find_best_move(self.board, self.depth, max_time=self.max_time, stats=stats, **self.search_options)
 
         # Handle pawn promotion (AI always promotes to queen)
         piece = self.board.piece_at(ai_move.from_square)
@@ -91,6 +117,10 @@ class CommandLineChess:
         self.board.push(ai_move)
         self.move_history.append(ai_move.uci())
         print(f"AI plays: {ai_move.uci()}")
+        print(f"Search: {stats}")
+
+        if self.ponderer is not None:
+            self.ponderer.start(self.board, stats.pv)
 
     # Run the main game loop for command line interaction.
     def run_game_loop(self):
@@ -107,6 +137,8 @@ class CommandLineChess:
 
                 if move_input == 'exit':
                     print("Game exited by user.")
+                    if self.ponderer is not None:
+                        self.ponderer.stop()
                     break
 
                 if not self.process_human_move(move_input):
@@ -146,9 +178,42 @@ def test_from_position(fen_string, moves_to_test=None, depth=3):
                     break
 
 # Start a normal game
-parser = argparse.ArgumentParser(description="Play Command Line Chess with Minimax AI.")
-parser.add_argument('--depth', type=int, default=3, help="Minimax search depth for the AI")
-args = parser.parse_args()
-
-#game = CommandLineChess()
-#game.run_game_loop()
+def main():
+    # Imported here so importing this module (the test scripts do) stays cheap
+    import os
+    import argparse
+    from ai.book import OpeningBook, DEFAULT_BOOK, BOOK_DEPTH
+    from ai.tablebase import Tablebase, DEFAULT_MAX_PIECES
+    from ai.search_cache import SearchCache, DEFAULT_CACHE
+
+    parser = argparse.ArgumentParser(description="Play Command Line Chess with Minimax AI.")
+    parser.add_argument('--depth', type=int, default=3, help="Minimax search depth for the AI")
+    parser.add_argument('--time', type=float, default=None, help="Seconds the AI may think per move (iterative deepening up to --depth)")
+    parser.add_argument('--fast-eval', action='store_true', help="Use the cheaper leaf evaluation (no legal move generation)")
+    parser.add_argument('--bitboard-eval', action='store_true', help="Score leaves with the bitboard evaluation backend")
+    parser.add_argument('--quiescence', action='store_true', help="Search captures and checks past the nominal depth")
+    parser.add_argument('--pvs', action='store_true', help="Principal variation search with null move pruning and late move reductions")
+    parser.add_argument('--book', default=DEFAULT_BOOK, help="Polyglot opening book to play from (built with python -m ai.book)")
+    parser.add_argument('--no-book', action='store_true', help="Always search, even in the opening")
+    parser.add_argument('--book-depth', type=int, default=BOOK_DEPTH, help="Plies the opening book is used for")
+    parser.add_argument('--syzygy', default=None, help="Directory with Syzygy tablebase files to probe in endgames")
+    parser.add_argument('--syzygy-pieces', type=int, default=DEFAULT_MAX_PIECES, help="Probe positions with at most this many pieces")
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE, default=None,
+                        help=f"Keep search results in a file between sessions (default file: {DEFAULT_CACHE})")
+    parser.add_argument('--ponder', action='store_true', help="Search the expected reply while you think")
+    parser.add_argument('--workers', type=int, default=1, help="Processes used to search the root moves")
+    args = parser.parse_args()
+
+    book = None
+    if not args.no_book and os.path.exists(args.book):
+        book = OpeningBook(args.book, args.book_depth)
+
+    game = CommandLineChess(depth=args.depth, max_time=args.time, ponder=args.ponder,
+                            fast_eval=args.fast_eval, bitboard_eval=args.bitboard_eval,
+                            quiescence=args.quiescence, pvs=args.pvs, workers=args.workers, book=book,
+                            tablebase=Tablebase(args.syzygy, args.syzygy_pieces) if args.syzygy else None,
+                            cache=SearchCache(args.cache) if args.cache else None)
+    game.run_game_loop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import sys
+import json
+import chess
+from ai.minimax import find_best_move
+from ai.stats import SearchStats
+
+# Lean engine entry point for short-lived processes (one process per move or
+# per game): only the search core is imported, no argparse, book, tablebase
+# or cache modules. Reads JSON requests from stdin, one per line, with the
+# fields server.py takes, and writes one JSON answer per line:
+#
+#   echo '{"moves": ["e2e4"], "depth": 3}' | python engine.py
+#   {"move": "e7e5", "depth": 3, "score": ..., "nodes": ..., "time": ...}
+
+# find_best_move options a request may set
+REQUEST_OPTIONS = ("fast_eval", "quiescence", "pvs", "bitboard_eval", "history_ordering", "incremental")
+
+
+def parse_options(items):
+    """
+    find_best_move keyword arguments from key=value strings, e.g.
+    ["fast_eval=true", "depth=3"]: booleans, ints and floats are converted,
+    anything else (a file name) stays a string.
+    """
+    options = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        if value.lower() in ("true", "false"):
+            options[key] = value.lower() == "true"
+        else:
+            for convert in (int, float, str):
+                try:
+                    options[key] = convert(value)
+                    break
+                except ValueError:
+                    pass
+    return options
+
+
+def search(request):
+    board = chess.Board(request.get("fen", chess.STARTING_FEN))
+    for uci in request.get("moves", []):
+        board.push_uci(uci)
+
+    options = {key: value for key, value in request.get("options", {}).items() if key in REQUEST_OPTIONS}
+    stats = SearchStats()
+    move = find_best_move(board, depth=request.get("depth"), max_time=request.get("max_time"),
+                          stats=stats, **options)
+    return {
+        "move": move.uci() if move else None,
+        "depth": stats.depth,
+        "score": stats.score,
+        "nodes": stats.nodes,
+        "time": round(stats.elapsed, 3),
+    }
+
+
+def main():
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            response = search(json.loads(line))
+        except Exception as error:
+            response = {"error": str(error)}
+        print(json.dumps(response), flush=True)
+
+if __name__ == "__main__":
+    main()
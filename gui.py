@@ -5,7 +5,10 @@ import time
 from game import process_move
 from game import check_endgame
 from game import isKingCheck
-from ai.minimax import find_best_move
+from ai.background import BackgroundSearch
+from ai.ponder import Ponderer
+from ai.book import load_default_book
+from ai.tablebase import Tablebase
 
 
 # CONSTANTS 
@@ -14,10 +17,19 @@ cell_size = H//8 # Cell Size
 sidebar_size = W - H
 cur_cell = None # Current Cell
 depth = 3 # minimax depth
+think_time = 5 # seconds the AI may spend on a move
+book = load_default_book() # opening book (books/self_play.bin), None if not built
+syzygy_dir = None # directory with Syzygy tablebase files, None to always search
+tablebase = Tablebase(syzygy_dir) if syzygy_dir else None
+fps = 30 # frames per second, the AI searches in between
+# AI searches run in a background thread: press F to make it move now,
+# Esc to cancel and take back your last move
+search = BackgroundSearch(max_depth=depth, max_time=think_time, book=book, tablebase=tablebase)
+ponder = True # search the expected reply while the human thinks
+ponderer = Ponderer(search, think_time)
 
 # pygame
-pg.init()
-scr = pg.display.set_mode((W,H)) # screen
+scr = None # screen, opened by main()
 
 
 # DRAW THE CHESS BOARD
@@ -158,6 +170,18 @@ def display_message(scr, mess, font_size=28, color="blue"):
 
 
 
+# Live progress of the AI search below the history
+def draw_search_progress(scr):
+    search_depth, best_move, nodes = search.progress()
+    progress_font = pg.font.Font(None, 20)
+    lines = [f"depth {search_depth}  nodes {nodes}",
+             f"best so far: {best_move.uci() if best_move else '-'}",
+             "F: move now   Esc: cancel"]
+    for i, line in enumerate(lines):
+        text = progress_font.render(line, True, pg.color.THECOLORS["black"])
+        scr.blit(text, (H + 20, H - (H//6) + 20 + i * 18))
+
+
 def handle_promotion(board, move):
 
     # Check if a pawn move to the last rank
@@ -247,7 +271,9 @@ def handle_promotion(board, move):
 
 
 def main():
-    global cur_cell, font
+    global cur_cell, font, scr
+    pg.init()
+    scr = pg.display.set_mode((W,H))
     start_time = time.time()
 
     is_running = True
@@ -260,6 +286,7 @@ def main():
     font = pg.font.Font(None, 24) # font
     highlight = []
     ai_move_highlight = []  # Highlight for AI moves
+    clock = pg.time.Clock()
 
     while is_running:
         # Check if any king is in check
@@ -278,8 +305,18 @@ def main():
 
         for ev in pg.event.get():
             if ev.type == pg.QUIT:
+                search.cancel()
                 is_running = False
 
+            if ev.type == pg.KEYDOWN and not board.turn and search.running():
+                if ev.key == pg.K_f: # force the AI to move now
+                    search.force()
+                elif ev.key == pg.K_ESCAPE and pending_white_move is not None: # cancel, take back white's move
+                    ponderer.stop()
+                    board.pop()
+                    pending_white_move = None
+                    ai_move_highlight = []
+
             if ev.type == pg.MOUSEBUTTONDOWN and board.turn and not board.is_game_over(): # Convert Click to cell here once a click is detected and is white's turn
                 cell = click_to_cell(ev.pos)
 
@@ -312,6 +349,8 @@ def main():
                     if move in board.legal_moves:
                         board.push(move)
                         pending_white_move = move
+                        if ponder:
+                            ponderer.opponent_moved(move) # keeps searching if the AI expected this move
 
                         # Check for promotion
                         if board.piece_at(cur_cell) and board.piece_at(cur_cell).piece_type == ch.PAWN:
@@ -323,14 +362,22 @@ def main():
                     cur_cell = None # reset move
                     highlight = []
 
-        if not board.turn and not board.is_game_over(): # If AI turn, Move AI using minimax
-            print("AI's Turn!---------")
+        opp_move = None
+        if is_running and not board.turn and not board.is_game_over(): # If AI turn, Move AI using minimax
+            if not search.running():
+                print("AI's Turn!---------")
+                search.start(board)
 
             # GUI HUI TO SHOW AI IS THINKING , BECAUSE WHO WOULD HAVE THOUGHT AI TAKES TIMMME
             display_message(scr, "AI THINKING!", 22, "red")
-            pg.display.flip()
+            draw_search_progress(scr)
+
+            result = ponderer.poll()
+            opp_move = result[0] if result else None
+            if result and opp_move is None: # forced before any move was found
+                opp_move = next(iter(board.legal_moves))
 
-            opp_move = find_best_move(board,depth)
+        if opp_move is not None:
             ai_move_highlight = [opp_move.from_square, opp_move.to_square]
 
             # Check if AI is promoting a pawn
@@ -341,6 +388,8 @@ def main():
                     opp_move = ch.Move(opp_move.from_square, opp_move.to_square, promotion=ch.QUEEN)
 
             board.push(opp_move)
+            if ponder:
+                ponderer.start(board, result[1].pv)
 
             if pending_white_move is not None:
                 move_hist.append((pending_white_move, opp_move))
@@ -351,8 +400,10 @@ def main():
 
 
         pg.display.flip()
+        clock.tick(fps)
 
 
     pg.quit()
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# Fixed position suite used by benchmark.py.
+# The first 20 are the positions of test.py / test_performance.py,
+# the rest are common engine test positions.
+
+TEST_POSITIONS = [
+    ("Fool's Mate", "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"),
+    ("Scholar's Mate", "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR b KQkq - 3 4"),
+    ("Stalemate", "k7/8/8/8/8/8/6R1/7K b - - 0 1"),
+    ("Pawn Promotion", "8/5k2/8/8/8/8/4P3/4K3 b - - 0 1"),
+    ("Defensive Position", "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 4 8"),
+    ("Checkmate in 2", "5rk1/ppp2ppp/3p4/4n3/2B5/2P2Q2/PP3PPP/R5K1 b - - 0 1"),
+    ("Complex Middlegame", "r1bq1rk1/pp1n1ppp/2p1pn2/3p4/2PP4/2NBPN2/PPQ2PPP/R4RK1 b - - 0 9"),
+    ("Rook Endgame", "5k2/8/8/8/8/8/4R3/4K3 b - - 0 1"),
+    ("Opposite Colored Bishops", "8/5k2/3b4/8/8/3B4/5K2/8 w - - 0 1"),
+    ("Perpetual Check", "5k2/5q2/5Q2/8/8/8/5K2/8 b - - 0 1"),
+    ("Sicilian Najdorf", "rnbqkb1r/1p2pppp/p2p1n2/8/3NP3/2N5/PPP2PPP/R1BQKB1R b KQkq - 0 6"),
+    ("Queen's Gambit Middlegame", "r1bq1rk1/pp1n1ppp/2p1pn2/3p4/2PP4/2NBPN2/PPQ2PPP/R3K2R b KQ - 1 9"),
+    ("Ruy Lopez Berlin Endgame", "r1bq1rk1/pppn1ppp/3p1n2/4p3/2BPP3/5N2/PPP2PPP/RNBQR1K1 b - - 1 9"),
+    ("King's Indian Attack", "rnbq1rk1/ppp1bppp/4pn2/3p4/3P1B2/2NBP3/PPPQ1PPP/R3K1NR b KQ - 5 8"),
+    ("Caro-Kann Structure", "rn1qkbnr/pp2pppp/2p5/3pPb2/3P4/5N2/PPP2PPP/RNBQKB1R w KQkq - 1 5"),
+    ("French Winawer", "rnbqk2r/ppp2ppp/4pn2/3p4/1b1PP3/2N2N2/PPP2PPP/R1BQKB1R w KQkq - 2 6"),
+    ("Slav Defense Activity", "rnbqkb1r/pp2pppp/2p2n2/3p4/2PP4/2N2N2/PP2PPPP/R1BQKB1R b KQkq - 1 4"),
+    ("Benoni Counterplay", "rnbqkb1r/pp1p1ppp/4pn2/2p5/2PP4/2N2N2/PP2PPPP/R1BQKB1R w KQkq c6 0 5"),
+    ("Dutch Defense Attack", "rnbq1rk1/pppp1ppp/4pn2/8/2PP4/5NP1/PP2PP1P/RNBQKB1R b KQ - 0 5"),
+    ("English Positional", "r1bqkb1r/pp1p1ppp/2n1pn2/2p5/2P5/2N1PN2/PP1P1PPP/R1BQKB1R w KQkq - 2 5"),
+]
+
+EXTRA_POSITIONS = [
+    ("Start Position", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"),
+    ("Kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("Rook and Pawns", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+    ("Promotion Tactics", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8"),
+    ("Symmetric Middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10"),
+    ("Queen Endgame", "8/8/3k4/8/3QK3/8/8/6q1 b - - 0 1"),
+    ("Knight vs Pawns", "8/8/8/3N4/2k5/8/1pp5/5K2 b - - 0 1"),
+    ("Open Center Tactics", "r1b1k2r/ppppqppp/2n2n2/2b5/2BNP3/2N5/PPP2PPP/R1BQK2R b KQkq - 0 7"),
+]
+
+BENCHMARK_POSITIONS = TEST_POSITIONS + EXTRA_POSITIONS
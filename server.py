@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import chess
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from ai.minimax import find_best_move
+from ai.transposition import TranspositionTable
+from ai.parallel import decode_position
+from ai.stats import SearchStats
+from engine import REQUEST_OPTIONS
+
+# Engine service: JSON lines over TCP, many games at once.
+#
+# Request:  {"id": 1, "game": "g42", "fen": "...", "moves": ["e2e4", ...],
+#            "max_time": 1.0, "depth": 6, "options": {"quiescence": true}}
+# Response: {"id": 1, "game": "g42", "move": "e7e5", "depth": 4, "score": 0.3,
+#            "nodes": 1234, "time": 0.98, "queued": 0.01}  or  {"id": 1, "error": "..."}
+# {"type": "stats"} returns the server counters, {"type": "end", "game": ...}
+# forgets a finished game.
+
+DEFAULT_PORT = 8765
+DEFAULT_MOVE_TIME = 1.0   # seconds, when a request doesn't give max_time
+MAX_MOVE_TIME = 30.0
+MIN_MOVE_TIME = 0.05      # what is left of a budget after queueing, at least
+
+# Per worker process: transposition tables of the games it served recently
+GAME_TABLES = 32
+TABLE_MB = 4
+
+
+# Worker process state: game -> TranspositionTable, least recently used first
+_tables = OrderedDict()
+_cache = {}
+
+
+def game_table(game):
+    """The game's table in this worker, a new one if it isn't kept here."""
+    if game in _tables:
+        _tables.move_to_end(game)
+    else:
+        _tables[game] = TranspositionTable(size_mb=TABLE_MB)
+        if len(_tables) > GAME_TABLES:
+            _tables.popitem(last=False)
+    return _tables[game]
+
+
+def worker_cache(path):
+    if path is None:
+        return None
+    if path not in _cache:
+        from ai.search_cache import SearchCache
+        _cache[path] = SearchCache(path)
+    return _cache[path]
+
+
+def search_request(game, fen, moves, max_time, depth, options, cache_path):
+    """Runs in a worker process: one move for one game."""
+    board = decode_position(fen, moves)
+    stats = SearchStats()
+    move = find_best_move(board, tt=game_table(game), max_time=max_time, max_depth=depth,
+                          stats=stats, cache=worker_cache(cache_path), **options)
+    return {
+        "move": move.uci() if move else None,
+        "depth": stats.depth,
+        "score": stats.score,
+        "nodes": stats.nodes,
+        "time": round(stats.elapsed, 3),
+    }
+
+
+class EngineServer:
+    """
+    Schedules move requests onto worker processes.
+
+    Each worker is its own single-process pool, so a game can go back to
+    the process that already holds its table (its "home"). Games take turns
+    round robin, with at most one request of a game searching at a time, so
+    a busy game can't starve the others. A request's time budget counts
+    from its arrival: time spent waiting in the queue is taken off the search.
+    """
+
+    def __init__(self, workers=None, default_time=DEFAULT_MOVE_TIME, max_time=MAX_MOVE_TIME,
+                 cache_path=None):
+        workers = workers or os.cpu_count() or 1
+        self.pools = [ProcessPoolExecutor(max_workers=1) for _ in range(workers)]
+        self.idle = deque(range(workers))
+        self.default_time = default_time
+        self.max_time = max_time
+        self.cache_path = cache_path
+        self.queues = OrderedDict()  # game -> deque of (request, arrival time, future), in turn order
+        self.searching = set()       # games with a request in a worker
+        self.home = {}               # game -> worker that last searched it
+        self.served = 0
+        self.warm = 0                # requests that went to the game's home worker
+
+    def close(self):
+        for pool in self.pools:
+            pool.shutdown(cancel_futures=True)
+
+    async def request_move(self, request):
+        future = asyncio.get_running_loop().create_future()
+        game = str(request.get("game", request.get("id")))
+        self.queues.setdefault(game, deque()).append((request, time.monotonic(), future))
+        self.dispatch()
+        return await future
+
+    def next_game(self):
+        """First game in turn order with a queued request and nothing searching."""
+        for game, queue in self.queues.items():
+            if queue and game not in self.searching:
+                return game
+        return None
+
+    def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self.idle:
+            game = self.next_game()
+            if game is None:
+                return
+            request, arrival, future = self.queues[game].popleft()
+            self.queues.move_to_end(game)  # back of the line
+
+            worker = self.home.get(game)
+            if worker in self.idle:
+                self.idle.remove(worker)
+                self.warm += 1
+            else:
+                worker = self.idle.popleft()
+            self.home[game] = worker
+            self.searching.add(game)
+
+            budget = min(float(request.get("max_time", self.default_time)), self.max_time)
+            queued = time.monotonic() - arrival
+            max_time = max(MIN_MOVE_TIME, budget - queued)
+            options = {key: value for key, value in request.get("options", {}).items() if key in REQUEST_OPTIONS}
+            task = loop.run_in_executor(self.pools[worker], search_request, game, request.get("fen", chess.STARTING_FEN),
+                                        request.get("moves", []), max_time, request.get("depth"), options,
+                                        self.cache_path)
+            task.add_done_callback(lambda task, game=game, worker=worker, future=future, queued=queued:
+                                   self.finished(task, game, worker, future, queued))
+
+    def finished(self, task, game, worker, future, queued):
+        self.idle.append(worker)
+        self.searching.discard(game)
+        self.served += 1
+        if not future.done():
+            if task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                result = task.result()
+                result["queued"] = round(queued, 3)
+                future.set_result(result)
+        if game in self.queues and not self.queues[game] and game not in self.searching:
+            del self.queues[game]
+        self.dispatch()
+
+    def end_game(self, game):
+        for _, _, future in self.queues.pop(game, ()):
+            if not future.done():
+                future.set_exception(ValueError(f"game {game} ended"))
+        self.home.pop(game, None)
+
+    def stats(self):
+        return {
+            "workers": len(self.pools),
+            "idle": len(self.idle),
+            "games_waiting": sum(1 for queue in self.queues.values() if queue),
+            "queued": sum(len(queue) for queue in self.queues.values()),
+            "served": self.served,
+            "warm": self.warm,
+        }
+
+    async def handle(self, request):
+        kind = request.get("type", "move")
+        if kind == "stats":
+            return self.stats()
+        if kind == "end":
+            self.end_game(str(request.get("game")))
+            return {"ended": request.get("game")}
+        if kind != "move":
+            raise ValueError(f"unknown request type: {kind}")
+        result = await self.request_move(request)
+        result["game"] = request.get("game")
+        return result
+
+    async def respond(self, line, writer):
+        request = {}
+        try:
+            request = json.loads(line)
+            response = await self.handle(request)
+        except Exception as error:
+            response = {"error": str(error)}
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+    async def serve_client(self, reader, writer):
+        """Requests of one connection run concurrently, responses come as they finish."""
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(self.respond(line, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, engine):
+    server = await asyncio.start_server(engine.serve_client, host, port)
+    print(f"Engine server on {host}:{port} with {len(engine.pools)} workers")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve moves for many games over JSON lines (TCP).")
+    parser.add_argument('--host', default="127.0.0.1", help="Address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument('--workers', type=int, default=None, help="Search processes (default: CPU count)")
+    parser.add_argument('--default-time', type=float, default=DEFAULT_MOVE_TIME,
+                        help="Seconds per move when a request doesn't say")
+    parser.add_argument('--max-time', type=float, default=MAX_MOVE_TIME, help="Upper limit of a request's max_time")
+    parser.add_argument('--cache', default=None, help="Search cache file the workers warm-start from and fill")
+    args = parser.parse_args()
+
+    engine = EngineServer(args.workers, args.default_time, args.max_time, args.cache)
+    try:
+        asyncio.run(serve(args.host, args.port, engine))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+
+if __name__ == "__main__":
+    main()
@@ -3,157 +3,292 @@ import chess.pgn
 import time
 import csv
 import os
+import math
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from ai.minimax import find_best_move
+from ai.transposition import TranspositionTable
+from ai.stats import SearchStats
+from ai.search_cache import SearchCache
+from engine import parse_options
 
 RESULTS_DIR = "self_play_results"
-os.makedirs(RESULTS_DIR, exist_ok=True)
 
-def simulate_game(depth_white, depth_black, game_id, flip_perspective=True):
+# Default engine matrix: name -> keyword arguments for find_best_move
+ENGINE_CONFIGS = {
+    "depth1": {"depth": 1},
+    "depth2": {"depth": 2},
+    "depth3": {"depth": 3},
+}
+
+CSV_FIELDS = [
+    "game_id", "white", "black", "white_config", "black_config", "opening",
+    "result", "termination", "total_moves", "white_time_sec", "black_time_sec",
+    "total_time_sec", "white_nodes", "black_nodes", "white_nps", "black_nps",
+    "white_ebf", "black_ebf", "white_cutoff_first_rate", "black_cutoff_first_rate",
+    "pgn_path",
+]
+
+# Stop games that run away (no engine resigns or claims draws)
+MAX_PLIES = 300
+
+
+def random_opening(plies, seed):
     """
-    Simulate a game with option to flip the board perspective.
-    When flip_perspective is True, white's moves are calculated by flipping the board
-    and finding the best move from black's perspective, then flipping back.
+    Play `plies` random legal moves from the start position so games
+    in a match don't all repeat the same line. Returns the list of moves.
     """
+    rng = random.Random(seed)
+    board = chess.Board()
+    moves = []
+    for _ in range(plies):
+        legal = list(board.legal_moves)
+        if not legal or board.is_game_over():
+            break
+        move = rng.choice(legal)
+        board.push(move)
+        moves.append(move)
+    return moves
+
+
+def simulate_game(white, black, game_id, opening_moves=(), save_pgn=True, cache_path=None):
+    """
+    Play one game between two engine configurations.
+    white/black are (name, config) pairs, config being the keyword
+    arguments passed to find_best_move for that side.
+    With cache_path both sides warm-start from (and add to) that search cache.
+    """
+    white_name, white_config = white
+    black_name, black_config = black
+
     board = chess.Board()
     game = chess.pgn.Game()
-    node = game
-    game.headers["White"] = f"AI_Depth_{depth_white}"
-    game.headers["Black"] = f"AI_Depth_{depth_black}"
+    game.headers["White"] = white_name
+    game.headers["Black"] = black_name
     game.headers["Event"] = f"Self-play Simulation {game_id}"
     game.headers["Date"] = time.strftime("%Y.%m.%d")
-    
-    move_number = 1
-    total_time = 0
 
-    while not board.is_game_over():
+    node = game
+    for move in opening_moves:
+        board.push(move)
+        node = node.add_variation(move)
+
+    # Each side keeps its own table so the engines don't share work
+    tables = {chess.WHITE: TranspositionTable(), chess.BLACK: TranspositionTable()}
+    configs = {chess.WHITE: white_config, chess.BLACK: black_config}
+    times = {chess.WHITE: 0.0, chess.BLACK: 0.0}
+    totals = {chess.WHITE: SearchStats(), chess.BLACK: SearchStats()}
+    ebf = {chess.WHITE: [], chess.BLACK: []}
+    cache = SearchCache(cache_path) if cache_path else None
+
+    while not board.is_game_over(claim_draw=True) and len(board.move_stack) < MAX_PLIES:
+        side = board.turn
+        stats = SearchStats()
         start = time.time()
-        
-        if board.turn == chess.WHITE and flip_perspective:
-            # For white's move, flip the board to use black's evaluation advantage
-            board_copy = board.copy()
-            board_copy.turn = chess.BLACK  # This doesn't actually flip the board
-            
-            # Get all legal moves from the original board
-            legal_moves = list(board.legal_moves)
-            
-            # Find the best move from black's perspective for all white's legal moves
-            best_score = float("-inf")
-            best_move = None
-            
-            for move in legal_moves:
-                board.push(move)
-                # Evaluate from black's perspective (which is biased positively for black)
-                board.turn = chess.BLACK  # Force evaluation from black's perspective
-                score = -evaluate_position(board)  # Negate because we're looking from white's perspective
-                board.turn = chess.WHITE  # Restore the correct turn
-                board.pop()
-                
-                if score > best_score:
-                    best_score = score
-                    best_move = move
-            
-            move = best_move
-        else:
-            # Normal minimax for black's moves
-            depth = depth_white if board.turn == chess.WHITE else depth_black
-            move = find_best_move(board, depth)
-        
-        elapsed = time.time() - start
-        total_time += elapsed
+        move = find_best_move(board, tt=tables[side], stats=stats, cache=cache, **configs[side])
+        times[side] += time.time() - start
+        totals[side].merge(stats)
+        if stats.depth > 1:
+            ebf[side].append(stats.branching_factor())
 
         if move is None:
             break
 
         board.push(move)
         node = node.add_variation(move)
-        move_number += 1
 
-    result = "1/2-1/2"  # Default to draw
-    termination = "UNKNOWN"
-    
-    if board.is_game_over():
-        outcome = board.outcome()
-        if outcome:
-            result = outcome.result()
-            termination = outcome.termination.name
+    if cache is not None:
+        cache.close()
+
+    result = "1/2-1/2"  # Default to draw (also for games cut at MAX_PLIES)
+    termination = "MAX_PLIES"
+
+    outcome = board.outcome(claim_draw=True)
+    if outcome:
+        result = outcome.result()
+        termination = outcome.termination.name
 
     game.headers["Result"] = result
     game.headers["Termination"] = termination
-    game.headers["FlippedPerspective"] = "Yes" if flip_perspective else "No"
 
-    # Save PGN file
-    pgn_path = os.path.join(RESULTS_DIR, f"game_{game_id}.pgn")
-    with open(pgn_path, "w") as pgn_file:
-        print(game, file=pgn_file)
+    pgn_path = ""
+    if save_pgn:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        pgn_path = os.path.join(RESULTS_DIR, f"game_{game_id}.pgn")
+        with open(pgn_path, "w") as pgn_file:
+            print(game, file=pgn_file)
 
     return {
         "game_id": game_id,
-        "white_depth": depth_white,
-        "black_depth": depth_black,
-        "flip_perspective": flip_perspective,
+        "white": white_name,
+        "black": black_name,
+        "white_config": format_config(white_config),
+        "black_config": format_config(black_config),
+        "opening": " ".join(move.uci() for move in opening_moves),
         "result": result,
         "termination": termination,
         "total_moves": board.fullmove_number,
-        "total_time_sec": round(total_time, 2),
+        "white_time_sec": round(times[chess.WHITE], 2),
+        "black_time_sec": round(times[chess.BLACK], 2),
+        "total_time_sec": round(times[chess.WHITE] + times[chess.BLACK], 2),
+        "white_nodes": totals[chess.WHITE].nodes,
+        "black_nodes": totals[chess.BLACK].nodes,
+        "white_nps": round(totals[chess.WHITE].nodes / times[chess.WHITE]) if times[chess.WHITE] else 0,
+        "black_nps": round(totals[chess.BLACK].nodes / times[chess.BLACK]) if times[chess.BLACK] else 0,
+        "white_ebf": round(sum(ebf[chess.WHITE]) / len(ebf[chess.WHITE]), 2) if ebf[chess.WHITE] else "",
+        "black_ebf": round(sum(ebf[chess.BLACK]) / len(ebf[chess.BLACK]), 2) if ebf[chess.BLACK] else "",
+        "white_cutoff_first_rate": round(totals[chess.WHITE].first_move_cutoff_rate(), 3),
+        "black_cutoff_first_rate": round(totals[chess.BLACK].first_move_cutoff_rate(), 3),
         "pgn_path": pgn_path,
     }
 
-def evaluate_position(board):
+
+def format_config(config):
+    return " ".join(f"{key}={value}" for key, value in sorted(config.items()))
+
+
+def parse_engine(spec):
     """
-    This is a simple wrapper function that will evaluate the board position.
-    We need this to evaluate white's moves from black's perspective.
+    Parse an engine given on the command line as NAME:key=value,key=value
+    e.g. "d2q:depth=2,quiescence=1,fast_eval=1".
     """
-    # Make a one-ply minimax call just to get the evaluation
-    temp_score, _ = minimax_one_ply(board, 0, float("-inf"), float("inf"), True)
-    return temp_score
+    name, _, options = spec.partition(":")
+    return name, parse_options(filter(None, options.split(",")))
+
 
-def minimax_one_ply(board, depth, alpha, beta, is_maxing):
+def schedule_games(engines, games_per_pair, opening_plies, seed):
     """
-    A one-ply version of minimax just to get position evaluation.
-    Imported from minimax.py but simplified to just get evaluation.
+    Round robin: every pair of engines plays games_per_pair games.
+    Games come in pairs on the same random opening with colours swapped.
     """
-    from ai.evaluation import evaluate
-    return evaluate(board), None
+    games = []
+    game_id = 1
+    for (name_a, config_a), (name_b, config_b) in itertools.combinations(engines.items(), 2):
+        for i in range(games_per_pair):
+            if i % 2 == 0:
+                opening = random_opening(opening_plies, seed + game_id) if opening_plies else []
+                games.append(((name_a, config_a), (name_b, config_b), game_id, opening))
+            else:
+                games.append(((name_b, config_b), (name_a, config_a), game_id, opening))
+            game_id += 1
+    return games
 
-def simulate_multiple_games():
-    depth_settings = [
-        (1, 1),
-        (2, 2),
-        (3, 3),
-        (2, 3),
-        (3, 2),
-    ]
 
+def game_score(result, white):
+    """Score of a game for one side: 1, 0.5 or 0."""
+    if result == "1-0":
+        return 1.0 if white else 0.0
+    if result == "0-1":
+        return 0.0 if white else 1.0
+    return 0.5
+
+
+def elo_difference(wins, draws, losses):
+    """
+    Elo difference implied by a score, with a 95% error margin.
+    Returns (elo, low, high); None values when the score is 0% or 100%,
+    and no range when every game ended the same way (zero variance says
+    nothing about the error).
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return None, None, None
+
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def to_elo(p):
+        if p <= 0 or p >= 1:
+            return None
+        return -400 * math.log10(1 / p - 1)
+
+    if variance == 0:
+        return to_elo(score), None, None
+    return to_elo(score), to_elo(score - margin), to_elo(score + margin)
+
+
+def summarize(results, engines):
+    """Per engine score against the field and Elo relative to the field."""
+    table = {name: [0, 0, 0] for name in engines}  # wins, draws, losses
+    for row in results:
+        for name, white in ((row["white"], True), (row["black"], False)):
+            score = game_score(row["result"], white)
+            table[name][0 if score == 1 else 1 if score == 0.5 else 2] += 1
+
+    summary = []
+    for name, (wins, draws, losses) in table.items():
+        elo, low, high = elo_difference(wins, draws, losses)
+        summary.append({"engine": name, "wins": wins, "draws": draws, "losses": losses,
+                        "elo": elo, "elo_low": low, "elo_high": high})
+    summary.sort(key=lambda row: (row["wins"] + row["draws"] / 2), reverse=True)
+    return summary
+
+
+def format_elo(value):
+    return "   n/a" if value is None else f"{round(value):+6d}"
+
+
+def run_tournament(engines, games_per_pair=2, workers=None, opening_plies=4, seed=0,
+                   csv_path=None, save_pgn=True, cache_path=None):
+    """
+    Play a round robin between the engine configurations using a process
+    pool. Each finished game is appended to the CSV immediately.
+    """
+    if csv_path is None:
+        csv_path = os.path.join(RESULTS_DIR, "results.csv")
+    os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+
+    games = schedule_games(engines, games_per_pair, opening_plies, seed)
     results = []
 
-    # First run: with flipped perspective for white
-    for idx, (w_depth, b_depth) in enumerate(depth_settings, 1):
-        print(f"\n=== Simulation {idx}: White depth {w_depth}, Black depth {b_depth} (Flipped Perspective) ===")
-        result = simulate_game(w_depth, b_depth, idx, flip_perspective=True)
-        results.append(result)
-        print(f"Game saved to {result['pgn_path']}")
-        print(f"Result: {result['result']} ({result['termination']})")
-        print(f"Total moves: {result['total_moves']}, Total time: {result['total_time_sec']}s")
-        print("=" * 50)
-
-    # Second run: without flipped perspective (original behavior)
-    for idx, (w_depth, b_depth) in enumerate(depth_settings, len(depth_settings) + 1):
-        print(f"\n=== Simulation {idx}: White depth {w_depth}, Black depth {b_depth} (Original) ===")
-        result = simulate_game(w_depth, b_depth, idx, flip_perspective=False)
-        results.append(result)
-        print(f"Game saved to {result['pgn_path']}")
-        print(f"Result: {result['result']} ({result['termination']})")
-        print(f"Total moves: {result['total_moves']}, Total time: {result['total_time_sec']}s")
-        print("=" * 50)
-
-    # Write results CSV
-    csv_path = os.path.join(RESULTS_DIR, "results.csv")
-    with open(csv_path, "w", newline="") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=results[0].keys())
+    with open(csv_path, "w", newline="") as csvfile, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDS)
         writer.writeheader()
-        writer.writerows(results)
+        csvfile.flush()
+
+        futures = [pool.submit(simulate_game, white, black, game_id, opening, save_pgn, cache_path)
+                   for white, black, game_id, opening in games]
+
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            writer.writerow(result)
+            csvfile.flush()
+            print(f"[{len(results)}/{len(games)}] game {result['game_id']}: "
+                  f"{result['white']} vs {result['black']} {result['result']} "
+                  f"({result['termination']}, {result['total_time_sec']}s, "
+                  f"{result['white_nps']}/{result['black_nps']} nps)")
+
+    print(f"\nResults saved in {csv_path}")
+    print(f"\n{'engine':<16}{'W':>5}{'D':>5}{'L':>5}   elo (95% range)")
+    for row in summarize(results, engines):
+        print(f"{row['engine']:<16}{row['wins']:>5}{row['draws']:>5}{row['losses']:>5}  "
+              f"{format_elo(row['elo'])} ({format_elo(row['elo_low'])} .. {format_elo(row['elo_high'])})")
+
+    return results
+
+
+def simulate_multiple_games():
+    parser = argparse.ArgumentParser(description="Round-robin self-play tournament between engine configurations.")
+    parser.add_argument('--engine', action='append', default=[],
+                        help="NAME:key=value,... (find_best_move arguments), repeat for each engine. "
+                             "Defaults to depth 1, 2 and 3.")
+    parser.add_argument('--games', type=int, default=2, help="Games per pairing (colours alternate)")
+    parser.add_argument('--workers', type=int, default=None, help="Parallel games (default: CPU count)")
+    parser.add_argument('--opening-plies', type=int, default=4, help="Random plies played before the engines take over")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the random openings")
+    parser.add_argument('--csv', default=None, help="Results CSV (default: self_play_results/results.csv)")
+    parser.add_argument('--no-pgn', action='store_true', help="Don't write a PGN file per game")
+    parser.add_argument('--cache', default=None,
+                        help="Search cache file shared by every game and later runs (engines then share work)")
+    args = parser.parse_args()
 
-    print(f"\nAll results saved in {RESULTS_DIR}/")
+    engines = dict(parse_engine(spec) for spec in args.engine) if args.engine else ENGINE_CONFIGS
+    run_tournament(engines, args.games, args.workers, args.opening_plies, args.seed,
+                   args.csv, not args.no_pgn, args.cache)
 
 if __name__ == "__main__":
     simulate_multiple_games()
@@ -1,5 +1,10 @@
 import chess as ch
 from cmdln import CommandLineChess, test_from_position
+from ai.minimax import find_best_move, minimax, SearchContext
+from ai.parallel import shutdown_pools
+from ai.transposition import TranspositionTable
+from ai.stats import SearchStats
+from positions import BENCHMARK_POSITIONS
 import time
 
 # Run a series of test positions to evaluate the AI's performance.
@@ -119,7 +124,81 @@ def run_realistic_tests():
     print(f"\nAll realistic tests completed in {elapsed_time:.2f} seconds")
 
 
-print("=== Running All Test Suites ===")
-run_tests()
-run_realistic_tests()
-print("\n=== All Tests Completed ===")
+# Score of a fixed-depth search of `fen` with the given table
+def search_score(fen, depth, tt, **options):
+    stats = SearchStats()
+    find_best_move(ch.Board(fen), depth, tt=tt, stats=stats, **options)
+    return stats.score
+
+
+# A table shared by searches of alternating depth must give the same scores
+# as a fresh table: entries of the other depth parity carry the other side's
+# initiative bonus and must not be reused. Quiescence scores depend a little
+# on the window (delta pruning), so those only have to agree to well under
+# the bonus.
+def run_table_parity_tests():
+    test_results = {"passed": 0, "failed": 0}
+    print("\n=== Transposition table across depths ===")
+    for options in ({}, {"pvs": True}, {"quiescence": True}):
+        tolerance = 1.0 if options.get("quiescence") else 1e-9
+        for name, fen in BENCHMARK_POSITIONS[:8]:
+            tt = TranspositionTable()
+            for depth in (3, 2, 3, 2):
+                shared = search_score(fen, depth, tt, **options)
+                fresh = search_score(fen, depth, TranspositionTable(), **options)
+                if shared == fresh or abs(shared - fresh) < tolerance:
+                    test_results["passed"] += 1
+                else:
+                    test_results["failed"] += 1
+                    print(f"FAIL {name} {options} depth {depth}: {shared} with the shared table, {fresh} fresh")
+    print(f"passed {test_results['passed']}, failed {test_results['failed']}")
+    return test_results
+
+
+# Quiescence score of `move` searched with a full window and a fresh table,
+# from the side to move (higher is better for both colours)
+def full_window_score(board, move, depth, **options):
+    board = board.copy()
+    board.push(move)
+    ctx = SearchContext(TranspositionTable(), **options)
+    score = minimax(board, depth - 1, float("-inf"), float("inf"), board.turn == ch.BLACK, ctx)[0]
+    return score if board.turn == ch.WHITE else -score
+
+
+# The parallel root search must pick the serial move. With quiescence the
+# windows differ between the two and delta pruning makes the scores window
+# dependent, so there the parallel move only has to be within a pawn of the
+# serial move when both are searched with a full window.
+def run_parallel_tests():
+    test_results = {"passed": 0, "failed": 0}
+    print("\n=== Parallel root search ===")
+    for options in ({}, {"quiescence": True}, {"quiescence": True, "fast_eval": True}):
+        for name, fen in BENCHMARK_POSITIONS:
+            board = ch.Board(fen)
+            if board.is_game_over():
+                continue
+            serial = find_best_move(board, 2, tt=TranspositionTable(), **options)
+            parallel = find_best_move(board, 2, tt=TranspositionTable(), workers=4, **options)
+            if serial == parallel:
+                test_results["passed"] += 1
+                continue
+            loss = 0.0
+            if options.get("quiescence"):
+                loss = full_window_score(board, serial, 2, **options) - full_window_score(board, parallel, 2, **options)
+            if options.get("quiescence") and loss <= 0.2:
+                test_results["passed"] += 1
+            else:
+                test_results["failed"] += 1
+                print(f"FAIL {name} {options}: serial {serial}, parallel {parallel}, {loss:.3f} worse")
+    shutdown_pools()
+    print(f"passed {test_results['passed']}, failed {test_results['failed']}")
+    return test_results
+
+
+if __name__ == "__main__":
+    print("=== Running All Test Suites ===")
+    run_tests()
+    run_realistic_tests()
+    run_table_parity_tests()
+    run_parallel_tests()
+    print("\n=== All Tests Completed ===")
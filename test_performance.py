@@ -120,10 +120,11 @@ def run_realistic_tests(depth):
 
 
 # Test different depths
-print("=== Running All Test Suites ===")
-for depth in range(1, 5):
-    print(f"\n=== Running tests with depth {depth} ===")
-    run_tests(depth)
-    run_realistic_tests(depth)
-print("\n=== All Tests Completed ===")
+if __name__ == "__main__":
+    print("=== Running All Test Suites ===")
+    for depth in range(1, 5):
+        print(f"\n=== Running tests with depth {depth} ===")
+        run_tests(depth)
+        run_realistic_tests(depth)
+    print("\n=== All Tests Completed ===")
 
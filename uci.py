@@ -0,0 +1,294 @@
+import sys
+import chess
+import threading
+from ai.minimax import find_best_move, MAX_DEPTH
+from ai.transposition import TranspositionTable
+from ai.stats import SearchStats
+from ai.evaluation import mateScore, nearMate, drawScore, material_values, initiative_bonus
+from ai.book import OpeningBook, DEFAULT_BOOK
+from ai.tablebase import Tablebase, DEFAULT_MAX_PIECES
+
+ENGINE_NAME = "KNTU4032 Minimax"
+ENGINE_AUTHOR = "KNTU4032"
+
+# Time management for "go wtime/btime": share of the clock used per move
+DEFAULT_MOVES_TO_GO = 30
+MOVE_OVERHEAD = 0.05  # seconds kept back for communication
+MIN_MOVE_TIME = 0.01
+
+# "go depth" and "go infinite" have no clock
+NO_TIME_LIMIT = 10 ** 9
+
+# One evaluation unit is 5 pawns (a pawn is worth 0.2)
+CENTIPAWNS = 100 / material_values[chess.PAWN]
+
+# name -> (UCI type, default, extra declaration)
+OPTIONS = {
+    "Hash": ("spin", 16, "min 1 max 4096"),
+    "Threads": ("spin", 1, "min 1 max 64"),
+    "FastEval": ("check", False, ""),
+    "Quiescence": ("check", False, ""),
+    "PVS": ("check", False, ""),
+    "BitboardEval": ("check", False, ""),
+    "Ponder": ("check", False, ""),
+    "OwnBook": ("check", False, ""),
+    "BookFile": ("string", DEFAULT_BOOK, ""),
+    "SyzygyPath": ("string", "<empty>", ""),
+    "SyzygyProbeLimit": ("spin", DEFAULT_MAX_PIECES, "min 0 max 7"),
+}
+
+
+def allocate_time(time_left, increment=0.0, moves_to_go=None):
+    """
+    Seconds to spend on a move with `time_left` on the clock: an even share
+    of the remaining moves plus most of the increment, never more than half
+    the clock.
+    """
+    moves = moves_to_go or DEFAULT_MOVES_TO_GO
+    budget = time_left / moves + increment * 0.8 - MOVE_OVERHEAD
+    return max(MIN_MOVE_TIME, min(budget, time_left / 2 - MOVE_OVERHEAD))
+
+
+def parse_position(tokens):
+    """Board from the arguments of a "position" command."""
+    if "moves" in tokens:
+        split = tokens.index("moves")
+        setup, moves = tokens[:split], tokens[split + 1:]
+    else:
+        setup, moves = tokens, []
+
+    if setup and setup[0] == "fen":
+        board = chess.Board(" ".join(setup[1:]))
+    else:
+        board = chess.Board()
+    for uci in moves:
+        board.push_uci(uci)
+    return board
+
+
+def parse_go(tokens):
+    """{name: value} of a "go" command, times in seconds."""
+    limits = {}
+    index = 0
+    while index < len(tokens):
+        name = tokens[index]
+        if name in ("infinite", "ponder"):
+            limits[name] = True
+            index += 1
+        elif name in ("depth", "movestogo", "nodes", "mate"):
+            limits[name] = int(tokens[index + 1])
+            index += 2
+        elif name in ("movetime", "wtime", "btime", "winc", "binc"):
+            limits[name] = int(tokens[index + 1]) / 1000
+            index += 2
+        else:
+            index += 1
+    return limits
+
+
+def format_score(score, turn, pv, depth):
+    """UCI score from the side to move's point of view (search scores are black's)."""
+    if score is None:
+        return "cp 0"
+    if abs(score) < mateScore and score not in (nearMate, -nearMate, drawScore):
+        # Leaf evaluations include initiative_bonus() of the side to move at
+        # the leaf, 25 pawns either way, which alternates with the parity of
+        # the depth. Take it out so the score doesn't flip sign between
+        # iterations (GUIs adjudicate resigns and draws from it). Mate and
+        # draw scores are returned without the bonus.
+        leaf_turn = turn if depth % 2 == 0 else not turn
+        score -= initiative_bonus(leaf_turn)
+    if turn == chess.WHITE:
+        score = -score
+    if abs(score) >= mateScore:
+        moves = max(1, (len(pv) + 1) // 2)
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {round(score * CENTIPAWNS)}"
+
+
+class UCIEngine:
+    """
+    UCI protocol around find_best_move. Commands are read on the main
+    thread; "go" starts the search in a background thread that prints
+    "info" lines after every iteration and "bestmove" at the end, and
+    "stop" ends it with the best move found so far. "go ponder" searches
+    without a clock until "ponderhit" starts the move's time, or "stop".
+    """
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.output_lock = threading.Lock()
+        self.board = chess.Board()
+        self.options = {name: default for name, (_, default, _) in OPTIONS.items()}
+        self.tt = TranspositionTable(size_mb=self.options["Hash"])
+        self.book = None
+        self.tablebase = None
+        self.thread = None
+        self.stop_event = None
+        self.release = None      # set when bestmove may be sent ("stop", or "ponderhit" with a clock)
+        self.ponder_time = None  # seconds for the move once "ponderhit" comes
+        self.timer = None
+
+    def send(self, line):
+        with self.output_lock:
+            print(line, file=self.out, flush=True)
+
+    def handle(self, line):
+        """Run one command, returns False on "quit"."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            for name, (kind, default, extra) in OPTIONS.items():
+                if kind == "check":
+                    default = str(default).lower()
+                self.send(f"option name {name} type {kind} default {default} {extra}".rstrip())
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.set_option(args)
+        elif command == "ucinewgame":
+            self.stop()
+            self.tt.clear()
+        elif command == "position":
+            self.stop()
+            self.board = parse_position(args)
+        elif command == "go":
+            self.go(parse_go(args))
+        elif command == "stop":
+            self.stop(wait=False)
+        elif command == "ponderhit":
+            self.ponder_hit()
+        elif command == "quit":
+            self.stop()
+            return False
+        return True
+
+    def set_option(self, args):
+        if "name" not in args:
+            return
+        split = args.index("value") if "value" in args else len(args)
+        name = " ".join(args[args.index("name") + 1:split])
+        value = " ".join(args[split + 1:])
+        if name not in OPTIONS:
+            self.send(f"info string unknown option {name}")
+            return
+
+        kind = OPTIONS[name][0]
+        if kind == "check":
+            value = value.lower() == "true"
+        elif kind == "spin":
+            value = int(value)
+        self.stop()
+        self.options[name] = value
+
+        if name == "Hash":
+            self.tt = TranspositionTable(size_mb=value)
+        elif name in ("OwnBook", "BookFile"):
+            self.book = None
+        elif name in ("SyzygyPath", "SyzygyProbeLimit"):
+            if self.tablebase is not None:
+                self.tablebase.close()
+            self.tablebase = None
+
+    def search_options(self):
+        """find_best_move keyword arguments from the UCI options."""
+        if self.options["OwnBook"] and self.book is None:
+            self.book = OpeningBook(self.options["BookFile"])
+        path = self.options["SyzygyPath"]
+        if path and path != "<empty>" and self.tablebase is None:
+            self.tablebase = Tablebase(path, self.options["SyzygyProbeLimit"])
+        return {
+            "tt": self.tt,
+            "workers": self.options["Threads"],
+            "fast_eval": self.options["FastEval"],
+            "quiescence": self.options["Quiescence"],
+            "pvs": self.options["PVS"],
+            "bitboard_eval": self.options["BitboardEval"],
+            "book": self.book if self.options["OwnBook"] else None,
+            "tablebase": self.tablebase,
+        }
+
+    def go(self, limits):
+        self.stop()
+        board = self.board.copy()
+        max_depth = limits.get("depth", MAX_DEPTH)
+        if "movetime" in limits:
+            max_time = limits["movetime"]
+        elif "wtime" in limits or "btime" in limits:
+            side = "w" if board.turn == chess.WHITE else "b"
+            max_time = allocate_time(limits.get(f"{side}time", 0), limits.get(f"{side}inc", 0),
+                                     limits.get("movestogo"))
+        else:
+            max_time = NO_TIME_LIMIT
+
+        # Pondering runs without a clock, the move's time starts at "ponderhit"
+        self.ponder_time = None
+        if limits.get("ponder", False) and not limits.get("infinite", False):
+            self.ponder_time = max_time
+            max_time = NO_TIME_LIMIT
+
+        # With "infinite" or "ponder" bestmove waits for "stop" (or "ponderhit")
+        self.stop_event = threading.Event()
+        self.release = threading.Event()
+        if not (limits.get("infinite", False) or limits.get("ponder", False)):
+            self.release.set()
+        self.thread = threading.Thread(target=self.search, daemon=True,
+                                       args=(board, max_time, max_depth, self.release, self.stop_event))
+        self.thread.start()
+
+    def ponder_hit(self):
+        """The opponent played the expected move: the ponder search becomes a timed one."""
+        if self.ponder_time is None:
+            return
+        if self.ponder_time < NO_TIME_LIMIT:
+            self.timer = threading.Timer(self.ponder_time, self.stop_event.set)
+            self.timer.daemon = True
+            self.timer.start()
+        self.ponder_time = None
+        self.release.set()
+
+    def search(self, board, max_time, max_depth, release, stop_event):
+        stats = SearchStats()
+
+        def report(stats):
+            self.send(f"info depth {stats.depth} score {format_score(stats.score, board.turn, stats.pv, stats.depth)} "
+                      f"nodes {stats.nodes} nps {round(stats.nps())} time {round(stats.elapsed * 1000)} "
+                      f"pv {' '.join(move.uci() for move in stats.pv)}")
+
+        move = find_best_move(board, max_time=max_time, max_depth=max_depth, stats=stats,
+                              callback=report, stop=stop_event, **self.search_options())
+        release.wait()
+        self.send(f"bestmove {move.uci() if move else '0000'}")
+
+    def stop(self, wait=True):
+        """End the running search (it still prints its bestmove)."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.stop_event is not None:
+            self.stop_event.set()
+            self.release.set()
+        self.ponder_time = None
+        if wait:
+            self.wait()
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def main():
+    engine = UCIEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+
+if __name__ == "__main__":
+    main()